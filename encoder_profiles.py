@@ -0,0 +1,151 @@
+import logging
+import os
+import subprocess
+import time
+
+BENCHMARK_SECONDS = 3 # length of the synthetic video encoded per profile
+DEFAULT_HEADROOM = 1.5 # required encoding speed (x real-time), capture and zoom need CPU as well
+VAAPI_DEVICE = '/dev/dri/renderD128'
+AUDIO_PARAMS = "-acodec aac -b:a 128k"
+MIN_SPEED = 0.95 # below this speed (x real-time) ffmpeg is not keeping up while recording
+SLOW_DURATION = 30 # seconds ffmpeg has to be too slow before falling back to a cheaper profile
+
+class EncoderProfile:
+    def __init__(self, name, encoder, output_params, mbit, framerate=30, input_params=''):
+        self.name = name
+        self.encoder = encoder
+        self.output_params = output_params
+        self.mbit = mbit # nominal bitrate (Mbit/s) of a meeting incl. audio, used to estimate disk space
+        self.framerate = framerate
+        self.input_params = input_params
+        self.speed = None # measured by benchmark()
+
+    def __str__(self):
+        speed = f", {self.speed:.2f}x" if self.speed is not None else ""
+        return f"{self.name} ({self.encoder}, {self.framerate} fps{speed})"
+
+# ordered by preference: best quality per size first, cheapest last
+PROFILES = [
+    EncoderProfile('nvenc_hevc', 'hevc_nvenc', "-c:v hevc_nvenc -preset p4 -b:v 1M " + AUDIO_PARAMS, 1.2),
+    EncoderProfile('vaapi_hevc', 'hevc_vaapi', "-vf 'hwupload,scale_vaapi=format=nv12' -c:v hevc_vaapi -b:v 1M " + AUDIO_PARAMS, 1.2,
+                   input_params=f"-vaapi_device {VAAPI_DEVICE}"),
+    EncoderProfile('nvenc_h264', 'h264_nvenc', "-c:v h264_nvenc -preset p4 -b:v 2M " + AUDIO_PARAMS, 2.2),
+    EncoderProfile('vaapi_h264', 'h264_vaapi', "-vf 'hwupload,scale_vaapi=format=nv12' -c:v h264_vaapi -b:v 2M " + AUDIO_PARAMS, 2.2,
+                   input_params=f"-vaapi_device {VAAPI_DEVICE}"),
+    EncoderProfile('av1', 'libsvtav1', "-c:v libsvtav1 -preset 10 -crf 35 " + AUDIO_PARAMS, 0.6),
+    EncoderProfile('x265', 'libx265', "-c:v libx265 -preset veryfast -crf 28 " + AUDIO_PARAMS, 0.8),
+    EncoderProfile('x264', 'libx264', "-c:v libx264 -preset veryfast -crf 23 " + AUDIO_PARAMS, 1.5),
+    EncoderProfile('x264_fast', 'libx264', "-c:v libx264 -preset ultrafast -crf 23 " + AUDIO_PARAMS, 1.0, framerate=15),
+    EncoderProfile('x264_minimal', 'libx264', "-c:v libx264 -preset ultrafast -crf 28 " + AUDIO_PARAMS, 0.5, framerate=10),
+]
+
+def find_profile(name):
+    for profile in PROFILES:
+        if profile.name == name:
+            return profile
+    return None
+
+def available_encoders():
+    """Names of the video encoders compiled into ffmpeg."""
+    try:
+        result = subprocess.run(['ffmpeg', '-hide_banner', '-encoders'], capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError) as e:
+        logging.error(f"Could not list ffmpeg encoders: {e}")
+        return set()
+    encoders = set()
+    for line in result.stdout.splitlines():
+        parts = line.split()
+        # e.g. " V....D libx264              libx264 H.264 / AVC ..."
+        if len(parts) >= 2 and parts[0].startswith('V') and len(parts[0]) == 6:
+            encoders.add(parts[1])
+    return encoders
+
+def benchmark(profile, resolution, seconds=BENCHMARK_SECONDS):
+    """
+    Encode a synthetic video of resolution at the profile's framerate and return
+    the speed (x real-time) or None if the encoder does not work on this host.
+    """
+    if profile.input_params.startswith('-vaapi_device') and not os.path.exists(VAAPI_DEVICE):
+        return None
+    command = f"ffmpeg -hide_banner -nostats -loglevel error {profile.input_params} " \
+              f"-f lavfi -i testsrc2=size={resolution}:rate={profile.framerate} " \
+              f"-f lavfi -i sine=frequency=440:sample_rate=48000 -t {seconds} " \
+              f"{profile.output_params} -f null -"
+    start = time.time()
+    try:
+        result = subprocess.run(command, shell=True, capture_output=True, text=True, timeout=seconds * 20)
+    except subprocess.TimeoutExpired:
+        return None
+    elapsed = time.time() - start
+    if result.returncode != 0:
+        logging.debug(f"Encoder profile {profile.name} not usable: {result.stderr.strip()}")
+        return None
+    return seconds / elapsed if elapsed > 0 else None
+
+class ProfileSelector:
+    """
+    Picks the most preferred encoder profile which encodes at least headroom
+    times faster than real-time on this host (benchmarked once at startup).
+    fallback() switches to the next cheaper usable profile, e.g. when ffmpeg
+    could not keep up with real-time during a recording.
+    """
+
+    def __init__(self, resolution, headroom=DEFAULT_HEADROOM):
+        self.resolution = resolution
+        self.headroom = headroom
+        self.usable = []
+        self.index = 0
+
+    def select(self):
+        encoders = available_encoders()
+        self.usable = []
+        for profile in PROFILES:
+            if profile.encoder not in encoders:
+                continue
+            profile.speed = benchmark(profile, self.resolution)
+            if profile.speed is not None and profile.speed >= 1.0:
+                self.usable.append(profile)
+            logging.info(f"Encoder profile {profile}")
+        if not self.usable:
+            logging.error("No encoder profile is real-time capable, using the cheapest")
+            self.usable = [PROFILES[-1]]
+        # first profile with enough headroom, otherwise the fastest
+        self.index = next((index for index, profile in enumerate(self.usable) if profile.speed and profile.speed >= self.headroom),
+                          max(range(len(self.usable)), key=lambda index: self.usable[index].speed or 0))
+        logging.info(f"Selected encoder profile {self.current()}")
+        return self.current()
+
+    def current(self):
+        return self.usable[self.index] if self.usable else None
+
+    def fallback(self):
+        """Switch to the next cheaper profile, returns it or None if there is none."""
+        if self.index + 1 >= len(self.usable):
+            return None
+        self.index += 1
+        logging.warning(f"Encoder profile falls back to {self.current()}")
+        return self.current()
+
+class SlowEncodingDetector:
+    """Progress callback calling on_slow() once if the speed stays below min_speed for duration seconds."""
+
+    def __init__(self, on_slow, min_speed=MIN_SPEED, duration=SLOW_DURATION):
+        self.on_slow = on_slow
+        self.min_speed = min_speed
+        self.duration = duration
+        self.slow_since = None
+        self.triggered = False
+
+    def __call__(self, stats):
+        try:
+            speed = float(stats.get('speed', '').rstrip('x'))
+        except ValueError:
+            return
+        if speed >= self.min_speed:
+            self.slow_since = None
+        elif self.slow_since is None:
+            self.slow_since = time.time()
+        elif not self.triggered and time.time() - self.slow_since >= self.duration:
+            self.triggered = True
+            logging.warning(f"ffmpeg encodes at {speed}x for {self.duration}s, not keeping up with real-time")
+            self.on_slow()
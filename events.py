@@ -11,7 +11,7 @@ except ImportError:
     from backports.zoneinfo import ZoneInfo # < 3.9
 from enum import Enum
 import shortuuid
-import sqlite3
+from sqlite_pool import get_pool, migrate
 from users import UserField
 from constants import DATE_FORMAT, TIME_FORMAT, DATETIME_FORMAT
 
@@ -319,47 +319,60 @@ class Events(ABC):
                     return entry.split(search_key)[1]
         return False
 
+# Schema migrations of the events table, applied in order (never change an applied one, append a new one)
+# IMPORTANT: order of field needs to align with EventFields order
+EVENT_MIGRATIONS = [
+    f'''
+    CREATE TABLE IF NOT EXISTS events (
+        {EventField.KEY.value} TEXT PRIMARY KEY,
+        {EventField.TYPE.value} INTEGER,
+        {EventField.TITLE.value} TEXT,
+        {EventField.DTSTART.value} TEXT,
+        {EventField.TIMEZONE.value} TEXT,
+        {EventField.DURATION.value} INTEGER,
+        {EventField.RRULE.value} TEXT,
+        {EventField.ID.value} TEXT,
+        {EventField.PASSWORD.value} TEXT,
+        {EventField.URL.value} TEXT,
+        {EventField.INSTRUCTION.value} TEXT,
+        {EventField.USER_KEY.value} TEXT NOT NULL,
+        {EventField.STATUS.value} INTEGER,
+        {EventField.ASSIGNED.value} TEXT,
+        {EventField.ASSIGNED_TIMESTAMP.value} TEXT,
+        {EventField.CREATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        {EventField.LAST_UPDATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY ({EventField.USER_KEY.value}) REFERENCES users({UserField.KEY.value})
+    )
+    ''',
+    # indexes of the client polling (type/status, type/last update), the lookup of
+    # existing events by meeting id or url and the foreign key to users
+    f'''
+    CREATE INDEX IF NOT EXISTS events_type_status ON events ({EventField.TYPE.value}, {EventField.STATUS.value}, {EventField.ASSIGNED.value});
+    CREATE INDEX IF NOT EXISTS events_type_last_updated ON events ({EventField.TYPE.value}, {EventField.LAST_UPDATED_TIMESTAMP.value});
+    CREATE INDEX IF NOT EXISTS events_id_status ON events ({EventField.ID.value}, {EventField.STATUS.value});
+    CREATE INDEX IF NOT EXISTS events_url_status ON events ({EventField.URL.value}, {EventField.STATUS.value});
+    CREATE INDEX IF NOT EXISTS events_user_key ON events ({EventField.USER_KEY.value})
+    ''',
+    # change log: revision of the latest create/update/delete of every event, existing events in update order
+    f'''
+    CREATE TABLE IF NOT EXISTS event_changes (
+        revision INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_key TEXT NOT NULL UNIQUE
+    );
+    INSERT INTO event_changes (event_key)
+        SELECT {EventField.KEY.value} FROM events ORDER BY {EventField.LAST_UPDATED_TIMESTAMP.value}
+    ''',
+]
+
 class SQLLiteEvents(Events):
     def __init__(self, db_path, stateChanged=None):
         self.db_path = db_path
+        self.pool = get_pool(db_path)  # connections shared with the other stores of db_path
         self.stateChanged = stateChanged  # Initialize the callback
         self._initialize_db()
 
     def _initialize_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            # Enable foreign key support
-            cursor.execute('PRAGMA foreign_keys = ON;')
-            
-            # Check if the table exists
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='events'")
-            table_exists = cursor.fetchone()
-
-            # IMPORTANT: order of field needs to align with EventFields order
-            if not table_exists:
-                cursor.execute(f'''
-                    CREATE TABLE events (
-                        {EventField.KEY.value} TEXT PRIMARY KEY,
-                        {EventField.TYPE.value} INTEGER,
-                        {EventField.TITLE.value} TEXT,
-                        {EventField.DTSTART.value} TEXT,
-                        {EventField.TIMEZONE.value} TEXT,
-                        {EventField.DURATION.value} INTEGER,
-                        {EventField.RRULE.value} TEXT,
-                        {EventField.ID.value} TEXT,
-                        {EventField.PASSWORD.value} TEXT,
-                        {EventField.URL.value} TEXT,
-                        {EventField.INSTRUCTION.value} TEXT,
-                        {EventField.USER_KEY.value} TEXT NOT NULL,
-                        {EventField.STATUS.value} INTEGER,
-                        {EventField.ASSIGNED.value} TEXT,
-                        {EventField.ASSIGNED_TIMESTAMP.value} TEXT,
-                        {EventField.CREATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        {EventField.LAST_UPDATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                        FOREIGN KEY ({EventField.USER_KEY.value}) REFERENCES users({UserField.KEY.value})
-                    )
-                ''')
-                conn.commit()
+        migrate(self.pool, 'events', EVENT_MIGRATIONS)
 
     def create(self, event):
         event = Events.clean(event)
@@ -369,7 +382,7 @@ class SQLLiteEvents(Events):
         event[EventField.CREATED_TIMESTAMP.value] = datetime.now()  # Set created timestamp
         event[EventField.LAST_UPDATED_TIMESTAMP.value] = event[EventField.CREATED_TIMESTAMP.value]  # Set last updated timestamp
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             
             # Create a list of field names in the order defined by the EventField enum
@@ -381,35 +394,40 @@ class SQLLiteEvents(Events):
                     {", ".join(field_names)}
                 ) VALUES ({", ".join("?" for _ in field_names)})
             ''', field_values)  # Use list comprehension to get values in the correct order
-            conn.commit()
+            self._log_change(cursor, event[EventField.KEY.value])
         
         return event
     
+    @staticmethod
+    def _conditions(filters):
+        conditions = []
+        parameters = []
+        if filters:
+            for filter in filters:
+                if len(filter) == 3:  # Ensure the query has three elements
+                    attribute, operator, value = filter
+                    if attribute and value is not None:
+                        conditions.append(f"events.{attribute} {operator} ?")
+                        parameters.append(value)
+                else:
+                    raise ValueError(f"Invalid filter format: {filter}")
+        return conditions, parameters
+
     def get(self, event_key=None, filters=None):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             
             # Start building the SQL query
             sql_query = 'SELECT * FROM events'
-            conditions = []
-            parameters = []
+
+            # Check for additional filter queries
+            conditions, parameters = SQLLiteEvents._conditions(filters)
 
             # Check for event_key
             if event_key:
                 conditions.append(f"{EventField.KEY.value} = ?")
                 parameters.append(event_key)
 
-            # Check for additional filter queries
-            if filters:
-                for filter in filters:
-                    if len(filter) == 3:  # Ensure the query has three elements
-                        attribute, operator, value = filter
-                        if attribute and value is not None:
-                            conditions.append(f"{attribute} {operator} ?")
-                            parameters.append(value)
-                    else:
-                        raise ValueError(f"Invalid filter format: {filter}")
-
             # Combine conditions into the SQL query
             if conditions:
                 sql_query += ' WHERE ' + ' AND '.join(conditions)
@@ -421,18 +439,58 @@ class SQLLiteEvents(Events):
                 return [{field.value: row[i] for i, field in enumerate(EventField)} for row in rows]
             return []  # Return an empty list if no events are found
 
+    def changes(self, since=0, filters=None):
+        """
+        Events created, updated or deleted (status deleted) after revision since,
+        matching filters, and the current revision to pass as since next time.
+        since 0 is a full snapshot without deleted events.
+        """
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
+            # one read transaction, so the revision matches the returned events
+            cursor.execute('BEGIN')
+            cursor.execute('SELECT COALESCE(MAX(revision), 0) FROM event_changes')
+            revision = cursor.fetchone()[0]
+
+            conditions, parameters = SQLLiteEvents._conditions(filters)
+            conditions.insert(0, 'event_changes.revision > ?')
+            parameters.insert(0, since)
+            if not since:
+                # nothing to remove from an empty snapshot
+                conditions.append(f'events.{EventField.STATUS.value} != ?')
+                parameters.append(EventStatus.DELETED.value)
+            cursor.execute(f'''
+                SELECT events.* FROM event_changes
+                JOIN events ON events.{EventField.KEY.value} = event_changes.event_key
+                WHERE {' AND '.join(conditions)}
+                ORDER BY event_changes.revision
+            ''', parameters)
+            rows = cursor.fetchall()
+
+        return [{field.value: row[i] for i, field in enumerate(EventField)} for row in rows], revision
+
+    def revision(self):
+        """Revision of the latest change."""
+        with self.pool.connection() as conn:
+            return conn.execute('SELECT COALESCE(MAX(revision), 0) FROM event_changes').fetchone()[0]
+
+    def _log_change(self, cursor, event_key):
+        """Assign the next revision to event_key, within the transaction of the change."""
+        cursor.execute('DELETE FROM event_changes WHERE event_key = ?', (event_key,))
+        cursor.execute('INSERT INTO event_changes (event_key) VALUES (?)', (event_key,))
+
     def update(self, event):
         event = Events.clean(event)
         event = Events.validate(event)
         event[EventField.LAST_UPDATED_TIMESTAMP.value] = datetime.now()  # Update last updated timestamp
         old_event = self.get(event[EventField.KEY.value])
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()         
             set_clause = ", ".join(f"{field} = ?" for field in event.keys())
             cursor.execute(f'''
                 UPDATE events SET {set_clause} WHERE {EventField.KEY.value} = ?
             ''', list(event.values()) + [event[EventField.KEY.value]])
-            conn.commit()
+            self._log_change(cursor, event[EventField.KEY.value])
 
         # Check for changes and call the callback if necessary
         if self.stateChanged and old_event != event:
@@ -441,11 +499,11 @@ class SQLLiteEvents(Events):
         return event
     
     def delete(self, event_key):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f'UPDATE events SET status = ?, {EventField.LAST_UPDATED_TIMESTAMP.value} = ? WHERE {EventField.KEY.value} = ?', 
                 (EventStatus.DELETED.value, datetime.now(), event_key,))
-            conn.commit()
+            self._log_change(cursor, event_key)
 
         old_event = self.get(event_key)
         event = {}
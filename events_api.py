@@ -28,13 +28,15 @@ def create_event_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event):
     else:
         raise Exception(f"Failed to create event. Response code: {response.status_code}, Response: {response.text}")  
 
-def delete_event_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event_key):
+def delete_event_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event_key, expired=False):
     """
-    Delete an event by calling the API.
+    Delete an event by calling the API. expired marks the routine deletion of a
+    past event by a client, the user is not notified about it.
     """
     url = f"{SERVER_URL}/event/{event_key}"
+    params = {'reason': 'expired'} if expired else None
     
-    response = requests.delete(url, auth=(SERVER_USERNAME, SERVER_PASSWORD))
+    response = requests.delete(url, params=params, auth=(SERVER_USERNAME, SERVER_PASSWORD))
     if response.status_code not in range(200, 299):
         raise Exception(f"Failed to delete event {event_key}. Response code: {response.status_code}, Response: {response.text}")
 
@@ -67,4 +69,40 @@ def get_event_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event_key=None,
     elif response.status_code == 204: # success, NO content returned
         return []
     else:
-        raise Exception(f"Failed to retrieve event(s). Response code: {response.status_code}, Response: {response.text}")
\ No newline at end of file
+        raise Exception(f"Failed to retrieve event(s). Response code: {response.status_code}, Response: {response.text}")
+
+def get_event_changes_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, since=0, filters=None, wait=0):
+    """
+    Retrieve the events changed (created, updated or deleted) after revision since.
+    With wait the server holds the request up to wait seconds until a change happens (long-poll).
+    Returns the events and the revision to pass as since next time.
+    """
+    url = f"{SERVER_URL}/event/changes"
+    params = {'since': since, 'wait': wait}
+    for i, entry in enumerate(filters or []):
+        if len(entry) == 3:  # Ensure the query has three elements
+            attribute, operator, value = entry
+            params[f"Filter.{i + 1}.Name"] = attribute
+            params[f"Filter.{i + 1}.Operator"] = operator
+            params[f"Filter.{i + 1}.Value"] = value
+
+    headers = {'Content-Type': 'application/json'}
+    response = requests.get(url, params=params, headers=headers, auth=(SERVER_USERNAME, SERVER_PASSWORD), timeout=wait + 30)
+
+    if response.status_code == 200:
+        changes = response.json()
+        return changes['events'], changes['revision']
+    else:
+        raise Exception(f"Failed to retrieve event changes. Response code: {response.status_code}, Response: {response.text}")
+
+def post_event_log_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event_key, content, timeout=30):
+    """
+    Append content to the server side log of an event.
+    """
+    url = f"{SERVER_URL}/log"
+    headers = {'Content-Type': 'application/json'}
+    data = {EventField.ID.value: event_key, 'content': content}
+
+    response = requests.post(url, json=data, headers=headers, auth=(SERVER_USERNAME, SERVER_PASSWORD), timeout=timeout)
+    if response.status_code not in range(200, 299):
+        raise Exception(f"Failed to post log of event {event_key}. Response code: {response.status_code}, Response: {response.text}")
@@ -1,10 +1,20 @@
+import multiprocessing
 import os
 
 #wsgi_app = 'zoomrec_server_app:app'
 bind = '0.0.0.0' +  ':' + os.getenv("DOCKER_API_PORT")
-worker_class = 'sync'
-loglevel = 'debug'
+# 'gthread' (default), 'sync' or an async worker such as 'gevent' (requires the package)
+# long-polling requests of /event/changes must not block the worker
+worker_class = os.getenv('GUNICORN_WORKER_CLASS') or 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS') or multiprocessing.cpu_count() * 2 + 1)
+if os.getenv('DEBUG', '') == 'zoomrec_server_app':
+    # the app listens for the debugger at import, a second worker could not bind its port
+    workers = 1
+threads = int(os.getenv('GUNICORN_THREADS') or 16) # per worker, gthread only
+worker_connections = int(os.getenv('GUNICORN_WORKER_CONNECTIONS') or 1000) # per worker, async workers only
+timeout = 90 # longer than the longest long-poll (60 seconds), relevant for sync workers
+loglevel = (os.getenv('LOG_LEVEL') or 'INFO').lower()
 LOG_DIR = os.path.join(os.getenv('ZOOMREC_HOME'), os.getenv('LOG_SUBDIR'))
 accesslog = os.path.join(LOG_DIR,'gunicorn_access_log')
 acceslogformat ="%(h)s %(l)s %(u)s %(t)s %(r)s %(s)s %(b)s %(f)s %(a)s"
-errorlog =  os.path.join(LOG_DIR,'gunicorn_error_log')
\ No newline at end of file
+errorlog =  os.path.join(LOG_DIR,'gunicorn_error_log')
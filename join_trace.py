@@ -0,0 +1,104 @@
+import json
+import logging
+import time
+
+REPORT_JOINS = 50 # number of latest joins aggregated by report()
+
+class JoinTrace:
+    """
+    Timing of the steps of one join. step(name) ends the current step (ok) and
+    starts the next, so steps are marked by a single line in join(). Retries,
+    failures and the time spent in fixed sleeps are recorded per step.
+    finish() appends the trace as one JSON line to path.
+    """
+
+    def __init__(self, path, event_key, title):
+        self.path = path
+        self.event_key = event_key
+        self.title = title
+        self.start = time.time()
+        self.steps = []
+        self.current = None
+        self.milestones = {}
+
+    def step(self, name):
+        self._end('ok')
+        self.current = {'name': name, 'start': time.time(), 'retries': 0, 'sleep': 0.0}
+
+    def retry(self):
+        if self.current:
+            self.current['retries'] += 1
+
+    def sleep(self, seconds):
+        """time.sleep() accounted to the current step."""
+        time.sleep(seconds)
+        if self.current:
+            self.current['sleep'] += seconds
+
+    def fail(self, reason=''):
+        if self.current:
+            self.current['reason'] = reason
+        self._end('failed')
+
+    def milestone(self, name):
+        """Seconds since the join started, e.g. 'recording_started'."""
+        self.milestones[name] = round(time.time() - self.start, 3)
+        logging.info(f"Join {name} after {self.milestones[name]:.1f}s")
+
+    def _end(self, outcome):
+        if self.current is None:
+            return
+        step = self.current
+        self.current = None
+        step['duration'] = round(time.time() - step.pop('start'), 3)
+        step['sleep'] = round(step['sleep'], 3)
+        step['outcome'] = outcome
+        self.steps.append(step)
+
+    def finish(self, outcome):
+        """End the trace with the outcome of the join ('recording', 'joined', 'failed', ...) and store it."""
+        self._end('ok' if outcome != 'failed' else 'failed')
+        trace = {
+            'event': self.event_key,
+            'title': self.title,
+            'start': time.strftime('%Y-%m-%dT%H:%M:%S', time.localtime(self.start)),
+            'duration': round(time.time() - self.start, 3),
+            'outcome': outcome,
+            'milestones': self.milestones,
+            'steps': self.steps
+        }
+        try:
+            with open(self.path, 'a') as f:
+                f.write(json.dumps(trace) + '\n')
+        except OSError as e:
+            logging.error(f"Error writing join trace: {e}")
+        logging.info("Join steps: " + ", ".join(f"{step['name']} {step['duration']:.1f}s" +
+            (f" ({step['retries']} retries)" if step['retries'] else "") +
+            (" FAILED" if step['outcome'] == 'failed' else "") for step in self.steps))
+
+    @staticmethod
+    def report(path, joins=REPORT_JOINS):
+        """Aggregate of the latest joins per step: runs, success rate, avg/p90/max duration, sleep and retries."""
+        try:
+            with open(path, 'r') as f:
+                traces = [json.loads(line) for line in f.readlines()[-joins:] if line.strip()]
+        except (OSError, ValueError) as e:
+            return f"No join traces: {e}"
+
+        steps = {}
+        for trace in traces:
+            for step in trace['steps']:
+                steps.setdefault(step['name'], []).append(step)
+        lines = [f"{len(traces)} joins, recording started after avg "
+                 f"{average([trace['milestones']['recording_started'] for trace in traces if 'recording_started' in trace.get('milestones', {})]):.1f}s"]
+        for name, runs in steps.items():
+            durations = sorted(step['duration'] for step in runs)
+            ok = sum(1 for step in runs if step['outcome'] == 'ok')
+            lines.append(f"{name}: runs: {len(runs)}, ok: {ok * 100 / len(runs):.0f}%, "
+                         f"avg: {average(durations):.1f}s, p90: {durations[int(0.9 * (len(durations) - 1))]:.1f}s, "
+                         f"max: {durations[-1]:.1f}s, sleep: {average([step['sleep'] for step in runs]):.1f}s, "
+                         f"retries: {average([step['retries'] for step in runs]):.1f}")
+        return "\n".join(lines)
+
+def average(values):
+    return sum(values) / len(values) if values else 0
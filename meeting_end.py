@@ -0,0 +1,120 @@
+import logging
+import subprocess
+import time
+try:
+    from Xlib import display, X # installed with pyautogui on Linux
+except ImportError:
+    display = None
+
+class ZoomProcessDetector:
+    """
+    Meeting ended if all processes of the Zoom process group have exited. zoom
+    is started through a launcher shell which may exit early, the group also
+    covers processes started later. Without a process nothing is reported.
+    """
+
+    def __init__(self, process):
+        self.process = process # ManagedProcess of zoom
+
+    def check(self):
+        if self.process is None or self.process.group_alive():
+            return None
+        return "Zoom process exited"
+
+class MeetingWindowDetector:
+    """Meeting ended if the meeting window (title matching one of titles) was shown and is closed."""
+
+    def __init__(self, titles):
+        self.titles = [title.lower() for title in titles]
+        self.display = None
+        self.seen = False
+
+    def _window_names(self):
+        if self.display is None:
+            self.display = display.Display()
+            self.net_client_list = self.display.intern_atom('_NET_CLIENT_LIST')
+            self.net_wm_name = self.display.intern_atom('_NET_WM_NAME')
+            self.utf8_string = self.display.intern_atom('UTF8_STRING')
+        root = self.display.screen().root
+        client_list = root.get_full_property(self.net_client_list, X.AnyPropertyType)
+        names = []
+        for window_id in (client_list.value if client_list else []):
+            window = self.display.create_resource_object('window', window_id)
+            try:
+                name = window.get_full_property(self.net_wm_name, self.utf8_string)
+                names.append(name.value.decode('utf-8', 'replace') if name else (window.get_wm_name() or ''))
+            except Exception:
+                # window closed meanwhile
+                continue
+        return names
+
+    def check(self):
+        if display is None:
+            return None
+        try:
+            names = self._window_names()
+        except Exception as e:
+            logging.debug(f"Could not read X11 window names: {e}")
+            self.display = None
+            return None
+        found = any(title in name.lower() for name in names for title in self.titles)
+        if found:
+            self.seen = True
+        elif self.seen:
+            return "Meeting window closed"
+        return None
+
+class AudioIdleDetector:
+    """Meeting ended if Zoom has had no playback stream on PulseAudio for idle seconds."""
+
+    def __init__(self, idle):
+        self.idle = idle
+        self.seen = False
+        self.idle_since = None
+
+    def _zoom_playing(self):
+        result = subprocess.run(['pactl', 'list', 'sink-inputs'], capture_output=True, text=True, timeout=5)
+        for line in result.stdout.splitlines():
+            line = line.strip().lower()
+            if (line.startswith('application.name') or line.startswith('application.process.binary')) and 'zoom' in line:
+                return True
+        return False
+
+    def check(self):
+        try:
+            playing = self._zoom_playing()
+        except (OSError, subprocess.SubprocessError) as e:
+            logging.debug(f"Could not list PulseAudio sink inputs: {e}")
+            return None
+        if playing:
+            self.seen = True
+            self.idle_since = None
+        elif self.seen:
+            if self.idle_since is None:
+                self.idle_since = time.time()
+            elif time.time() - self.idle_since >= self.idle:
+                return f"Zoom audio stream idle for {self.idle}s"
+        return None
+
+def create_detectors(config, zoom_process):
+    """
+    Create the detectors configured in the EndDetection section of zoom.yaml.
+    Returns a list of (name, interval, detector).
+    """
+    detectors = []
+    for name, settings in (config or {}).items():
+        settings = settings or {}
+        if name == 'process':
+            detector = ZoomProcessDetector(zoom_process)
+        elif name == 'window':
+            if display is None:
+                logging.warning("python-xlib not available, meeting window end detection disabled")
+                continue
+            detector = MeetingWindowDetector(settings.get('titles', ['Zoom Meeting']))
+        elif name == 'audio':
+            detector = AudioIdleDetector(settings.get('idle', 30))
+        else:
+            logging.error(f"Unknown meeting end detector '{name}'")
+            continue
+        detectors.append((name, settings.get('interval', 1), detector))
+    return detectors
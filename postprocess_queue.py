@@ -0,0 +1,129 @@
+import json
+import logging
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime
+
+IDLE_POLL_INTERVAL = 60 # seconds between checks if idle-only jobs may start
+
+def default_workers():
+    # postprocessing (transcoding/transcription) is CPU heavy, leave cores for the next recording
+    return max(1, (os.cpu_count() or 2) // 2)
+
+class PostprocessQueue:
+    """
+    Persistent queue of postprocessing jobs. Every job is a JSON file in path
+    which is only removed after the job has completed, so jobs pending or
+    running when the client stopped are run again after a restart.
+    Jobs are executed by a pool of worker threads, each running the job as a
+    subprocess through run(job) which returns its exit code. on_start(job) and
+    on_done(job, returncode, duration) report progress (e.g. to the event API).
+    Jobs with a command in idle_only (e.g. 'compact') wait until is_idle()
+    returns True, i.e. no meeting is being recorded.
+    """
+
+    def __init__(self, path, run, workers=None, on_start=None, on_done=None, idle_only=(), is_idle=None):
+        self.path = path
+        self.run = run
+        self.workers = workers or default_workers()
+        self.on_start = on_start
+        self.on_done = on_done
+        self.idle_only = set(idle_only)
+        self.is_idle = is_idle or (lambda: True)
+        self.jobs = queue.Queue()
+        self.running = {}
+        self.queued = {}
+        self.lock = threading.Lock()
+        os.makedirs(path, exist_ok=True)
+
+    def start(self):
+        """Queue the jobs left over from a previous run and start the workers."""
+        for file in sorted(os.listdir(self.path)):
+            if file.endswith('.json'):
+                try:
+                    with open(os.path.join(self.path, file), 'r') as f:
+                        job = json.load(f)
+                    if job['id'] in self.queued:
+                        continue
+                    logging.info(f"Resuming postprocessing job {job['id']} '{job['command']}' of '{job['filename']}'")
+                    self._put(job)
+                except (OSError, ValueError, KeyError) as e:
+                    logging.error(f"Invalid postprocessing job '{file}': {e}")
+        for index in range(self.workers):
+            thread = threading.Thread(target=self.work, args=(), name=f"postprocess-{index}")
+            thread.daemon = True  # Daemonize thread
+            thread.start()
+        logging.info(f"Started {self.workers} postprocessing workers")
+        return self
+
+    def enqueue(self, command, filename, event=None):
+        """Persist a job and queue it, returns immediately."""
+        job = {
+            'id': datetime.now().strftime('%Y%m%d%H%M%S%f') + '-' + uuid.uuid4().hex[:8], # sorts by creation
+            'command': command,
+            'filename': filename,
+            'event': event,
+            'created': time.time()
+        }
+        temp_file = self._job_file(job) + '.tmp'
+        with open(temp_file, 'w') as f:
+            json.dump(job, f)
+        os.replace(temp_file, self._job_file(job))
+        self._put(job)
+        logging.info(f"Queued postprocessing job {job['id']} '{command}' of '{filename}' ({self.jobs.qsize()} pending)")
+        return job
+
+    def work(self):
+        while True:
+            job = self.jobs.get()
+            while job['command'] in self.idle_only and not self.is_idle():
+                time.sleep(IDLE_POLL_INTERVAL)
+            with self.lock:
+                self.running[job['id']] = job
+            start = time.time()
+            returncode = None
+            try:
+                if self.on_start:
+                    self.on_start(job)
+                returncode = self.run(job)
+            except Exception as e:
+                logging.error(f"Postprocessing job {job['id']} failed: {e}")
+            duration = time.time() - start
+            try:
+                os.remove(self._job_file(job))
+            except OSError:
+                pass
+            with self.lock:
+                self.running.pop(job['id'], None)
+                self.queued.pop(job['id'], None)
+            try:
+                if self.on_done:
+                    self.on_done(job, returncode, duration)
+            except Exception as e:
+                logging.error(f"Postprocessing job {job['id']}: error reporting completion: {e}")
+            self.jobs.task_done()
+
+    def _put(self, job):
+        with self.lock:
+            self.queued[job['id']] = job
+        self.jobs.put(job)
+
+    def pending_jobs(self):
+        """Jobs waiting or running."""
+        with self.lock:
+            return list(self.queued.values())
+
+    def running_jobs(self):
+        with self.lock:
+            return list(self.running.values())
+
+    def pending(self):
+        """Number of jobs waiting or running."""
+        with self.lock:
+            return self.jobs.qsize() + len(self.running)
+
+    def _job_file(self, job):
+        return os.path.join(self.path, job['id'] + '.json')
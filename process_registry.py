@@ -0,0 +1,141 @@
+import atexit
+import logging
+import os
+import select
+import signal
+import subprocess
+import threading
+import time
+
+DEFAULT_STOP_TIMEOUT = 10 # seconds to wait for a process group to exit before it is killed
+
+class ManagedProcess:
+    """
+    Child process started by the ProcessRegistry in its own process group.
+    State is taken from the Popen object and the process group, never from
+    scanning /proc.
+    """
+
+    def __init__(self, name, popen):
+        self.name = name
+        self.popen = popen
+        self.pid = popen.pid
+        self.pgid = os.getpgid(popen.pid)
+        self.started = time.time()
+
+    def running(self):
+        """True while the process (group leader) has not exited."""
+        return self.popen.poll() is None
+
+    def group_alive(self):
+        """True while any process of the process group exists."""
+        # reap the leader first, a zombie still counts as member of the group
+        self.popen.poll()
+        try:
+            os.killpg(self.pgid, 0)
+            return True
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+
+    def wait(self, timeout=None):
+        """
+        Wait until the process exited and return its exit code, None on timeout.
+        Uses a pidfd if available so waiting with a timeout doesn't poll.
+        """
+        if self.popen.returncode is not None:
+            return self.popen.returncode
+        if timeout is not None and hasattr(os, 'pidfd_open'):
+            try:
+                fd = os.pidfd_open(self.pid)
+            except OSError:
+                fd = None
+            if fd is not None:
+                try:
+                    ready, _, _ = select.select([fd], [], [], timeout)
+                finally:
+                    os.close(fd)
+                if not ready:
+                    return None
+                timeout = None
+        try:
+            return self.popen.wait(timeout)
+        except subprocess.TimeoutExpired:
+            return None
+
+    def signal(self, sig):
+        """Send sig to the whole process group, returns False if the group is gone."""
+        try:
+            os.killpg(self.pgid, sig)
+            return True
+        except ProcessLookupError:
+            return False
+
+    def __str__(self):
+        state = 'running' if self.running() else f"exited ({self.popen.returncode})"
+        return f"{self.name} [pid {self.pid}]: {state}, {time.time() - self.started:.0f}s"
+
+class ProcessRegistry:
+    """
+    Tracks the processes (zoom, ffmpeg, postprocess, ...) spawned by zoomrec by
+    name. Each process gets its own process group which is signalled as a whole.
+    Processes still registered at exit are stopped by a single atexit handler.
+    """
+
+    def __init__(self):
+        self.processes = {}
+        self.lock = threading.Lock()
+        atexit.register(self.stop_all)
+
+    def spawn(self, name, command, **kwargs):
+        """Start command (shell) in a new process group and register it as name."""
+        self.stop(name)
+        kwargs.setdefault('shell', True)
+        kwargs.setdefault('start_new_session', True)
+        process = ManagedProcess(name, subprocess.Popen(command, **kwargs))
+        with self.lock:
+            self.processes[name] = process
+        logging.debug(f"Started {process}")
+        return process
+
+    def get(self, name):
+        with self.lock:
+            return self.processes.get(name)
+
+    def stop(self, name, sig=signal.SIGQUIT, timeout=DEFAULT_STOP_TIMEOUT):
+        """
+        Signal the process group of name and wait up to timeout seconds (None:
+        without limit) for the process to exit, afterwards the group is killed.
+        Returns the exit code.
+        """
+        with self.lock:
+            process = self.processes.pop(name, None)
+        if process is None:
+            return None
+        process.signal(sig)
+        returncode = process.wait(timeout)
+        if returncode is None:
+            logging.warning(f"{process.name} did not exit within {timeout}s, killing it")
+            process.signal(signal.SIGKILL)
+            returncode = process.wait()
+        if process.group_alive():
+            # leftovers of the group (e.g. started by a launcher script)
+            process.signal(signal.SIGKILL)
+        logging.debug(f"Stopped {process}")
+        return returncode
+
+    def stop_all(self, sig=signal.SIGQUIT, timeout=DEFAULT_STOP_TIMEOUT):
+        with self.lock:
+            names = list(self.processes)
+        for name in names:
+            self.stop(name, sig, timeout)
+
+    def state(self):
+        """Dictionary name -> True if still running, for logging/status."""
+        with self.lock:
+            return {name: process.running() for name, process in self.processes.items()}
+
+    def __str__(self):
+        with self.lock:
+            return "\n".join(str(process) for process in self.processes.values())
@@ -0,0 +1,230 @@
+import logging
+import os
+import shutil
+import subprocess
+import threading
+import time
+
+SEGMENT_DIR_SUFFIX = '.parts' # segments of 'x.mkv' are written to 'x.parts/'
+SEGMENT_PREFIX = 'part-'
+MANIFEST = 'segments.ffconcat' # list of completed segments, written by ffmpeg
+CONCAT_LIST = 'concat.ffconcat' # list of all segments used for the final file
+PROGRESS_PARAMS = "-progress pipe:1" # ffmpeg writes key=value progress blocks to stdout
+STALL_TIMEOUT = 15 # seconds without progress after which ffmpeg is regarded as blocked
+MIN_SPEED = 1.0 # recording falls behind real-time below this speed
+SLOW_ALERT_SEC = 60 # seconds the speed has to stay below MIN_SPEED before alerting
+DROP_ALERT_RATE = 0.05 # share of captured frames dropped between two checks above which is alerted
+
+def segment_dir(filename):
+    return os.path.splitext(filename)[0] + SEGMENT_DIR_SUFFIX
+
+def segment_output(filename, segment_minutes):
+    """
+    ffmpeg output options writing segments of segment_minutes minutes instead of filename.
+    Completed segments are listed in the manifest, the container format stays the one of filename.
+    """
+    directory = segment_dir(filename)
+    os.makedirs(directory, exist_ok=True)
+    extension = os.path.splitext(filename)[1] or '.mkv'
+    pattern = os.path.join(directory, f"{SEGMENT_PREFIX}%05d{extension}")
+    manifest = os.path.join(directory, MANIFEST)
+    return f"-f segment -segment_time {int(segment_minutes * 60)} -reset_timestamps 1 " \
+           f"-segment_list \"{manifest}\" -segment_list_type ffconcat \"{pattern}\""
+
+def add_video_filter(output_params, video_filter):
+    """Put video_filter in front of the -vf filter chain of output_params (before e.g. hwupload)."""
+    for quote in ("'", '"'):
+        if f"-vf {quote}" in output_params:
+            return output_params.replace(f"-vf {quote}", f"-vf {quote}{video_filter},", 1)
+    if "-vf " in output_params:
+        return output_params.replace("-vf ", f"-vf {video_filter},", 1)
+    return f"{output_params} -vf {video_filter}"
+
+def vfr_output_params(output_params, max_fps, keyframe_sec):
+    """
+    Output options recording with variable framerate: duplicate frames (static
+    slides, screen without changes) are dropped by mpdecimate before encoding.
+    At least one frame and a key frame are written every keyframe_sec seconds.
+    """
+    max_dropped = max(1, int(max_fps * keyframe_sec) - 1)
+    return add_video_filter(output_params, f"mpdecimate=max={max_dropped}") + \
+        f" -force_key_frames \"expr:gte(t,n_forced*{keyframe_sec})\" -vsync vfr"
+
+def completed_segments(filename):
+    """Segments closed by ffmpeg so far (from the manifest), can be processed while recording."""
+    manifest = os.path.join(segment_dir(filename), MANIFEST)
+    segments = []
+    try:
+        with open(manifest, 'r') as f:
+            for line in f:
+                if line.startswith('file '):
+                    segments.append(os.path.join(segment_dir(filename), line[5:].strip().strip("'")))
+    except OSError:
+        pass
+    return segments
+
+def segment_files(filename):
+    """All segment files incl. the last one which is not listed in the manifest if ffmpeg died."""
+    directory = segment_dir(filename)
+    if not os.path.isdir(directory):
+        return []
+    extension = os.path.splitext(filename)[1] or '.mkv'
+    return [os.path.join(directory, file) for file in sorted(os.listdir(directory))
+            if file.startswith(SEGMENT_PREFIX) and file.endswith(extension)
+            and os.path.getsize(os.path.join(directory, file)) > 0]
+
+def finalize_segments(filename):
+    """
+    Concatenate all segments losslessly (stream copy) into filename and remove
+    them. Segments are kept if concatenation fails. Returns True on success.
+    """
+    segments = segment_files(filename)
+    if not segments:
+        logging.error(f"No segments found for '{filename}'")
+        return False
+
+    concat_list = os.path.join(segment_dir(filename), CONCAT_LIST)
+    with open(concat_list, 'w') as f:
+        f.write("ffconcat version 1.0\n")
+        for segment in segments:
+            f.write(f"file '{os.path.basename(segment)}'\n")
+
+    result = subprocess.run(['ffmpeg', '-nostats', '-loglevel', 'error', '-y', '-f', 'concat', '-safe', '0',
+                             '-i', concat_list, '-c', 'copy', filename], capture_output=True, text=True)
+    if result.returncode != 0:
+        logging.error(f"Concatenating {len(segments)} segments into '{filename}' failed: {result.stderr.strip()}")
+        return False
+
+    shutil.rmtree(segment_dir(filename), ignore_errors=True)
+    logging.info(f"Concatenated {len(segments)} segments into '{filename}'")
+    return True
+
+def recover_segments(rec_path):
+    """Finalize segments left over by a crashed recording (no final file written)."""
+    if not os.path.isdir(rec_path):
+        return
+    for entry in os.listdir(rec_path):
+        if entry.endswith(SEGMENT_DIR_SUFFIX) and os.path.isdir(os.path.join(rec_path, entry)):
+            filename = os.path.join(rec_path, entry[:-len(SEGMENT_DIR_SUFFIX)]) + '.mkv'
+            if segment_files(filename):
+                logging.info(f"Recovering interrupted recording '{filename}'")
+                finalize_segments(filename)
+
+class FfmpegProgress:
+    """
+    Reads the progress blocks ffmpeg writes with PROGRESS_PARAMS to its stdout
+    in a thread. The latest values (frame, fps, speed, drop_frames, ...) are
+    kept in stats, on_progress(stats) is called for every block.
+    """
+
+    def __init__(self, stdout, on_progress=None):
+        self.stdout = stdout
+        self.on_progress = on_progress
+        self.stats = {}
+        self.updated = None
+        self.thread = threading.Thread(target=self.run, args=())
+        self.thread.daemon = True  # Daemonize thread
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        block = {}
+        for line in iter(self.stdout.readline, b''):
+            key, _, value = line.decode('utf-8', 'replace').strip().partition('=')
+            if not key:
+                continue
+            block[key] = value.strip()
+            if key == 'progress':
+                # last line of a block
+                self.stats = block
+                self.updated = time.time()
+                block = {}
+                if self.on_progress:
+                    try:
+                        self.on_progress(self.stats)
+                    except Exception as e:
+                        logging.error(f"Error handling ffmpeg progress: {e}")
+
+    def speed(self):
+        """Encoding speed (x real-time) of the last block or None."""
+        try:
+            return float(self.stats.get('speed', '').rstrip('x'))
+        except ValueError:
+            return None
+
+class RecordingHealth:
+    """
+    Health of a running recording from its FfmpegProgress: check() returns a
+    status line (fps, speed, duplicated/dropped frames, bitrate, size) and an
+    alert text if ffmpeg exited, is blocked, stays below min_speed for
+    slow_alert_sec seconds or drops more than drop_rate of the frames since
+    the previous check (alerted once per exit, stall, slow or dropping period).
+    """
+
+    def __init__(self, process, progress, min_speed=MIN_SPEED, slow_alert_sec=SLOW_ALERT_SEC, drop_rate=DROP_ALERT_RATE):
+        self.process = process
+        self.progress = progress
+        self.min_speed = min_speed
+        self.slow_alert_sec = slow_alert_sec
+        self.drop_rate = drop_rate
+        self.started = time.time()
+        self.slow_since = None
+        self.slow_alerted = False
+        self.exit_alerted = False
+        self.stall_alerted = False
+        self.drop_alerted = False
+        self.dropped = 0
+        self.frames = 0
+
+    def status(self):
+        stats = self.progress.stats
+        size = int(stats.get('total_size', '0')) if stats.get('total_size', '').isdigit() else 0
+        return f"{self.process.name}: fps={stats.get('fps', '-')} speed={stats.get('speed', '-')} " \
+               f"dup={stats.get('dup_frames', '-')} drop={stats.get('drop_frames', '-')} " \
+               f"bitrate={stats.get('bitrate', '-')} size={size / 1048576:.0f}MB"
+
+    def check(self):
+        status = self.status()
+        if not self.process.running():
+            if self.exit_alerted:
+                return status, None
+            self.exit_alerted = True
+            return status, f"{self.process.name} exited with code {self.process.popen.returncode}"
+
+        last_update = self.progress.updated or self.started
+        if time.time() - last_update > STALL_TIMEOUT:
+            if self.stall_alerted:
+                return status, None
+            self.stall_alerted = True
+            return status, f"{self.process.name} reported no progress for {time.time() - last_update:.0f}s"
+        self.stall_alerted = False
+
+        alerts = []
+        # a few dropped frames are normal for x11grab, only a high rate is alerted
+        dropped = self.progress.stats.get('drop_frames', '')
+        frames = self.progress.stats.get('frame', '')
+        if dropped.isdigit() and frames.isdigit():
+            new_dropped = int(dropped) - self.dropped
+            captured = new_dropped + int(frames) - self.frames
+            if captured > 0:
+                rate = new_dropped / captured
+                if rate <= self.drop_rate:
+                    self.drop_alerted = False
+                elif not self.drop_alerted:
+                    self.drop_alerted = True
+                    alerts.append(f"{rate * 100:.0f}% of the frames dropped ({new_dropped} of {captured})")
+            self.dropped = int(dropped)
+            self.frames = int(frames)
+
+        speed = self.progress.speed()
+        if speed is None or speed >= self.min_speed:
+            self.slow_since = None
+            self.slow_alerted = False
+        elif self.slow_since is None:
+            self.slow_since = time.time()
+        elif not self.slow_alerted and time.time() - self.slow_since >= self.slow_alert_sec:
+            self.slow_alerted = True
+            alerts.append(f"speed {speed}x below {self.min_speed}x for {time.time() - self.slow_since:.0f}s, client is under-provisioned")
+        return status, (f"{self.process.name}: " + ", ".join(alerts)) if alerts else None
@@ -0,0 +1,57 @@
+#!/bin/bash
+
+# Help message function
+print_help() {
+    echo "Usage: $0 input_file"
+    echo "  input_file: Path to the (lossless) recording, replaced by the re-encoded file"
+    echo "Environment:"
+    echo "  COMPACT_THREADS: max. encoder threads (default: 2)"
+    echo "  COMPACT_PARAMS: ffmpeg output parameters (default: x265 CRF 28, AAC 96k)"
+    echo "Example: $0 recording.mkv"
+}
+
+# Duration of a media file in seconds
+duration() {
+    ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "$1"
+}
+
+# Check if no arguments are passed, then print help message
+if [ "$#" -eq 0 ]; then
+    print_help
+    exit 1
+fi
+
+input_file="$1"
+threads="${COMPACT_THREADS:-2}"
+params="${COMPACT_PARAMS:--c:v libx265 -preset medium -crf 28 -x265-params pools=$threads -c:a aac -b:a 96k}"
+
+# Temporary file in the same directory, so the final rename is atomic
+output_file="${input_file%.*}.compact.${input_file##*.}"
+
+start_time=$(date +%s)
+input_size=$(stat -c %s "$input_file")
+
+# Re-encode with lowest CPU and IO priority and bounded threads to leave room for recordings
+nice -n 19 ionice -c 3 ffmpeg -hide_banner -loglevel error -nostats -y -threads "$threads" -i "$input_file" \
+    $params -threads "$threads" "$output_file"
+if [ $? -ne 0 ]; then
+    echo "Re-encoding $input_file failed"
+    rm -f "$output_file"
+    exit 1
+fi
+
+# Verify duration parity (max. 1 second difference)
+input_duration=$(duration "$input_file")
+output_duration=$(duration "$output_file")
+if ! awk -v a="$input_duration" -v b="$output_duration" 'BEGIN { d = a - b; if (d < 0) d = -d; exit !(b != "" && d <= 1) }'; then
+    echo "Duration mismatch: $input_file ${input_duration}s, $output_file ${output_duration}s"
+    rm -f "$output_file"
+    exit 1
+fi
+
+# Atomically replace the original
+mv -f "$output_file" "$input_file"
+
+end_time=$(date +%s)
+output_size=$(stat -c %s "$input_file")
+echo "Compacted $input_file from $((input_size / 1048576)) MB to $((output_size / 1048576)) MB in $((end_time - start_time)) seconds"
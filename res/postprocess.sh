@@ -5,6 +5,7 @@ if [ "$#" -ne 2 ]; then
     echo "Usage: $0 <command> <filename>"
     echo "Valid Command:"
     echo "  transcribe - transcribe video"
+    echo "  compact - re-encode (lossless) recording to a storage efficient codec"
 
     exit 1
 fi
@@ -17,6 +18,9 @@ case $POSTPROCESS_COMMAND in
     "transcribe")
         transcribe_video.sh "$FILENAME"
         ;;
+    "compact")
+        compact_video.sh "$FILENAME"
+        ;;
     "test")
         # just for testing
         sleep 30
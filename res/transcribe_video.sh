@@ -48,16 +48,28 @@ if [ -f "$stats_file" ]; then
     exit 0
 fi
 
-# Extract audio file name
-audio_file="${input_file%.*}.wav"
+# Audio recorded in parallel to the video (RECORDING_AUDIO), otherwise extracted below
+audio_file=""
+for extension in wav opus; do
+    if [ -f "${input_file%.*}.$extension" ]; then
+        audio_file="${input_file%.*}.$extension"
+        break
+    fi
+done
 
 # Extract optional parameter for device (default is GPU)
 # for whisper.cpp OpenVino
 device="${2:-GPU}"
 
-# Extract audio using ffmpeg
+# Extract audio using ffmpeg (only if not recorded separately)
 # ffmpeg -hide_banner -loglevel error -stats -y -i "$input_file" -vn -acodec copy "$audio_file"
-ffmpeg -hide_banner -loglevel error -stats -y -i "$input_file" -vn -acodec pcm_s16le -ar 16000 "$audio_file"
+if [ -z "$audio_file" ]; then
+    audio_file="${input_file%.*}.wav"
+    ffmpeg -hide_banner -loglevel error -stats -y -i "$input_file" -vn -acodec pcm_s16le -ar 16000 "$audio_file"
+fi
+
+# Get audio length in seconds (from the small audio file, before it is deleted)
+audio_length=$(ffprobe -v error -show_entries format=duration -of default=noprint_wrappers=1:nokey=1 "$audio_file")
 
 # Transcribe and store output file in the same directory as input file
 # whisper "$audio_file" --model small --language English -o  "$input_dir"
@@ -76,9 +88,6 @@ end_time=$(date +%s)
 # Calculate elapsed time
 elapsed_time=$((end_time - start_time))
 
-# Get audio length in seconds
-audio_length=$(ffmpeg -i "$audio_file" 2>&1 | grep "Duration" | cut -   ed s/,// | awk -F: '{print ($1 * 3600) + ($2 * 60) + $3}')
-
 # Calculate x factor
 x_factor=$(bc <<< "scale=2; $audio_length / $elapsed_time")
 
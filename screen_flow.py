@@ -0,0 +1,186 @@
+import logging
+import time
+import pyautogui
+from screen_matcher import ScreenMatcher, Tick
+from supervisor import Check, DEFAULT_PRIORITY
+
+class Step:
+    """
+    Compiled step of a screen flow defined in zoom.yaml:
+
+      - <name>:
+          locate_image: 'x.png' # optional, template to look for (without: actions always run)
+          confidence: 0.9       # optional, default of the matcher
+          iterations: 1         # optional, number of screenshots searched until found
+          sleep: 0              # optional, seconds between iterations and after the actions
+          log: 'text'           # optional, logged (info) when found
+          error: 'text'         # optional, logged (error) when found
+          click:                # optional, click the found image (empty) or the given template
+          eval: 'python code'   # optional, executed when found, x and y are the center of the found image
+          success: <step(s)>    # optional, step or list of steps executed when found
+          failed: <step(s)>     # optional, step or list of steps executed when not found
+          interval: 10          # optional, top level steps only: seconds between checks by the supervisor
+          priority: 10          # optional, top level steps only: lower runs first within a tick
+          budget: 0.5           # optional, top level steps only: seconds a check may take before it is run less often
+    """
+
+    def __init__(self, name, config):
+        self.name = name
+        config = config or {}
+        self.locate_image = config.get('locate_image')
+        self.confidence = config.get('confidence')
+        self.iterations = max(1, int(config.get('iterations', 1)))
+        self.sleep = float(config.get('sleep', 0))
+        self.log = config.get('log')
+        self.error = config.get('error')
+        self.click = 'click' in config
+        self.click_image = config.get('click')
+        self.code = compile(config['eval'], f"<{name}>", 'exec') if config.get('eval') else None
+        self.success = Step.compile_list(f"{name}.success", config.get('success'))
+        self.failed = Step.compile_list(f"{name}.failed", config.get('failed'))
+        self.interval = config.get('interval')
+        self.priority = config.get('priority', DEFAULT_PRIORITY)
+        self.budget = config.get('budget')
+
+    @staticmethod
+    def compile_list(name, config):
+        """Compile a step (dictionary) or list of named steps."""
+        if not config:
+            return []
+        if isinstance(config, dict):
+            return [Step(name, config)]
+        steps = []
+        for entry in config:
+            for step_name, step_config in entry.items():
+                steps.append(Step(f"{name}.{step_name}" if name else step_name, step_config))
+        return steps
+
+    def templates(self):
+        """All template images this step (including sub steps) may search for."""
+        names = [self.locate_image] if self.locate_image else []
+        if self.click_image:
+            names.append(self.click_image)
+        for step in self.success + self.failed:
+            names.extend(step.templates())
+        return names
+
+class StepTiming:
+    def __init__(self):
+        self.count = 0
+        self.found = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, duration, found):
+        self.count += 1
+        self.found += 1 if found else 0
+        self.total += duration
+        self.max = max(self.max, duration)
+
+    def __str__(self):
+        average = self.total / self.count if self.count else 0
+        return f"runs: {self.count}, found: {self.found}, avg: {average * 1000:.1f} ms, max: {self.max * 1000:.1f} ms"
+
+class Flow:
+    """
+    Execution plan of a list of steps compiled once from zoom.yaml.
+    A tick checks all steps against one shared screenshot, a new screenshot is
+    only taken after an action (click/eval) changed the screen or for further
+    iterations. Durations of all steps are collected in timings.
+    """
+
+    def __init__(self, name, config, matcher, namespace=None):
+        self.name = name
+        self.matcher = matcher
+        self.namespace = namespace if namespace is not None else {}
+        self.steps = Step.compile_list('', config)
+        self.timings = {}
+        for step in self.steps:
+            matcher.register(*step.templates())
+
+    def tick(self, frame=None):
+        """Run all steps once. Returns True if any action was executed."""
+        tick = Tick(self.matcher, frame)
+        acted = False
+        for step in self.steps:
+            acted = self.execute(step, tick) or acted
+        return acted
+
+    def checks(self, interval, budget=None):
+        """One supervisor Check per top level step, using the step's interval/priority/budget if set."""
+        return [Check(f"{self.name}.{step.name}", lambda tick, step=step: self.execute(step, tick),
+                      step.interval or interval, step.priority, step.budget or budget) for step in self.steps]
+
+    def execute(self, step, tick):
+        """Run a top level step with the (shared) tick. Returns True if any action was executed."""
+        return self._execute(step, tick, None)
+
+    def _execute(self, step, tick, center):
+        start = time.time()
+        acted = False
+        found = True
+        if step.locate_image:
+            box = None
+            for iteration in range(step.iterations):
+                if iteration > 0:
+                    time.sleep(step.sleep)
+                    tick.invalidate()
+                box = tick.locate(step.locate_image, step.confidence)
+                if box is not None:
+                    break
+            found = box is not None
+            if found:
+                center = ScreenMatcher.center(box)
+
+        if found:
+            if step.log:
+                logging.info(step.log)
+            if step.error:
+                logging.error(step.error)
+            if step.click:
+                target = center
+                if step.click_image:
+                    target = ScreenMatcher.center(tick.locate(step.click_image, step.confidence))
+                if target is not None:
+                    pyautogui.click(target[0], target[1])
+                    acted = True
+                else:
+                    logging.error(f"Step '{self.name}.{step.name}': nothing to click!")
+            if step.code is not None:
+                self._eval(step, center)
+                acted = True
+            if acted:
+                tick.invalidate()
+                if step.sleep:
+                    time.sleep(step.sleep)
+        self.timings.setdefault(step.name, StepTiming()).add(time.time() - start, found)
+
+        for sub_step in (step.success if found else step.failed):
+            acted = self._execute(sub_step, tick, center) or acted
+        return acted
+
+    def _eval(self, step, center):
+        variables = {'x': center[0], 'y': center[1]} if center is not None else {'x': None, 'y': None}
+        try:
+            exec(step.code, self.namespace, variables)
+        except Exception as e:
+            logging.error(f"Step '{self.name}.{step.name}': error in eval: {e}")
+            return
+        # assignments e.g. 'ONGOING_MEETING = False' update the namespace
+        for key, value in variables.items():
+            if key not in ('x', 'y'):
+                self.namespace[key] = value
+
+    def timing_report(self):
+        return "\n".join(f"{self.name}.{name}: {timing}" for name, timing in self.timings.items())
+
+def compile_flows(config, matcher, namespace=None):
+    """Compile all flows (sections with a list of steps) of the screen control configuration."""
+    flows = {}
+    for name, steps in (config or {}).items():
+        if isinstance(steps, list):
+            try:
+                flows[name] = Flow(name, steps, matcher, namespace)
+            except Exception as e:
+                logging.error(f"Error compiling screen flow '{name}': {e}")
+    return flows
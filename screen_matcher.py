@@ -0,0 +1,287 @@
+import logging
+import os
+import time
+import cv2
+import numpy
+import pyautogui
+from pyautogui import ImageNotFoundException
+
+DEFAULT_CONFIDENCE = 0.9
+DEFAULT_FULL_SEARCH_INTERVAL = 60 # seconds between full screen searches for templates with a region
+LAST_HIT_MARGIN = 20 # pixels around the last hit searched first
+SIGNATURE_SIZE = (64, 36) # thumbnail size used to detect screen changes
+SIGNATURE_THRESHOLD = 8 # max. pixel difference of thumbnails regarded as unchanged screen
+MIN_POLL_INTERVAL = 0.05 # seconds between screenshots while the screen is changing
+MAX_POLL_INTERVAL = 1.0 # seconds between screenshots while the screen is static
+RECHECK_INTERVAL = 5 # seconds after which templates are matched again even on a static screen
+TEMPLATE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp')
+
+class TemplateCache:
+    """
+    Registry of all template images below img_path, read and decoded once.
+    Images are stored as OpenCV arrays (BGR or grayscale) and optionally
+    pre-scaled, so matching never touches the disk again. Names are the
+    paths relative to img_path e.g. 'join.png' or 'v5/wait_for_host.png'.
+    """
+
+    def __init__(self, img_path, grayscale=False, scale=1.0):
+        self.img_path = img_path
+        self.grayscale = grayscale
+        self.scale = scale
+        self.templates = {}
+        self.load()
+
+    def load(self):
+        """(Re)load all template images found below img_path."""
+        self.templates = {}
+        if not os.path.isdir(self.img_path):
+            logging.error(f"Template image path '{self.img_path}' not found!")
+            return
+        for root, dirs, files in os.walk(self.img_path):
+            for file in sorted(files):
+                if file.lower().endswith(TEMPLATE_EXTENSIONS):
+                    name = os.path.relpath(os.path.join(root, file), self.img_path)
+                    try:
+                        self.templates[name] = self._decode(os.path.join(root, file))
+                    except IOError as e:
+                        logging.error(str(e))
+        logging.info(f"Loaded {len(self.templates)} template images from '{self.img_path}'")
+
+    def _decode(self, path):
+        image = cv2.imread(path, cv2.IMREAD_GRAYSCALE if self.grayscale else cv2.IMREAD_COLOR)
+        if image is None:
+            raise IOError(f"Failed to read template image '{path}'")
+        if self.scale != 1.0:
+            image = cv2.resize(image, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA)
+        return image
+
+    def get(self, name):
+        """Return the decoded template, images added after startup are loaded on first use."""
+        if name not in self.templates:
+            self.templates[name] = self._decode(os.path.join(self.img_path, name))
+        return self.templates[name]
+
+    def convert(self, screenshot):
+        """Convert a PIL screenshot into the same color space as the cached templates."""
+        frame = numpy.array(screenshot.convert('RGB'))
+        if self.grayscale:
+            return cv2.cvtColor(frame, cv2.COLOR_RGB2GRAY)
+        return cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
+
+class ScreenMatcher:
+    """
+    Locate several templates on the screen using a single screenshot.
+    Each call to grab() does one X11 capture which is converted to an OpenCV
+    array once, so all templates checked against that frame share both
+    the capture and the conversion. Templates come from a TemplateCache.
+
+    Searches are narrowed by region hints: a template is searched around its
+    last hit first, then in its configured region (fractions of the screen
+    [left, top, width, height]) and only on a miss in the full screen. For
+    templates with a configured region the full screen search is done at most
+    every full_search_interval seconds, as most checks are for popups which
+    are not showing.
+    """
+
+    def __init__(self, cache, templates=None, confidence=DEFAULT_CONFIDENCE, regions=None,
+                 full_search_interval=DEFAULT_FULL_SEARCH_INTERVAL):
+        self.cache = cache
+        self.confidence = confidence
+        self.regions = regions or {}
+        self.full_search_interval = full_search_interval
+        self.last_hits = {}
+        self.last_full_search = {}
+        self.templates = []
+        if templates:
+            self.register(*templates)
+
+    def register(self, *names):
+        """Register template image names checked by match()."""
+        for name in names:
+            if name not in self.templates:
+                self.templates.append(name)
+
+    def grab(self):
+        """Take one screenshot and return it as OpenCV array."""
+        return self.cache.convert(pyautogui.screenshot())
+
+    def locate(self, name, frame=None, confidence=None, min_search_time=0):
+        """
+        Return the Box of template name in frame or None if not found.
+        Without frame new screenshots are taken and searched until found or
+        min_search_time seconds have passed (like pyautogui.locateOnScreen).
+        """
+        if frame is not None:
+            return self._locate(name, frame, confidence)
+        start = time.time()
+        while True:
+            box = self._locate(name, self.grab(), confidence)
+            if box is not None or time.time() - start > min_search_time:
+                return box
+
+    def locate_center(self, name, frame=None, confidence=None, min_search_time=0):
+        """Return the center Point of template name or None if not found."""
+        return ScreenMatcher.center(self.locate(name, frame, confidence, min_search_time))
+
+    def match(self, names=None, frame=None, confidence=None):
+        """
+        Check templates names (default: all registered) against a single frame
+        (new screenshot if None). Returns a dictionary name -> Box or None.
+        """
+        if frame is None:
+            frame = self.grab()
+        return {name: self._locate(name, frame, confidence) for name in (names or self.templates)}
+
+    def wait_for(self, names, timeout, confidence=None):
+        """
+        Wait until one of the templates names shows on the screen.
+        Returns (name, Box) of the first template found or (None, None) on timeout.
+        Screenshots are compared by a cheap thumbnail signature and templates are
+        only matched if the screen has changed (or RECHECK_INTERVAL passed). The
+        poll interval backs off while the screen is static.
+        """
+        deadline = time.time() + timeout
+        signature = None
+        last_match = 0
+        delay = MIN_POLL_INTERVAL
+        while True:
+            screenshot = pyautogui.screenshot()
+            new_signature = ScreenMatcher.signature(screenshot)
+            if ScreenMatcher.changed(signature, new_signature) or time.time() - last_match >= RECHECK_INTERVAL:
+                last_match = time.time()
+                hits = self.match(names, self.cache.convert(screenshot), confidence)
+                for name in names:
+                    if hits[name] is not None:
+                        return name, hits[name]
+                delay = MIN_POLL_INTERVAL
+            else:
+                delay = min(delay * 2, MAX_POLL_INTERVAL)
+            signature = new_signature
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return None, None
+            time.sleep(min(delay, remaining))
+
+    def wait_until_gone(self, name, timeout, confirm_time=1, confidence=None):
+        """
+        Wait until template name is no longer on the screen, confirmed by a second
+        screenshot confirm_time seconds later. Returns False on timeout.
+        Like wait_for() templates are only matched if the screen has changed.
+        """
+        deadline = time.time() + timeout
+        signature = None
+        last_match = 0
+        gone_since = None
+        delay = MIN_POLL_INTERVAL
+        while True:
+            screenshot = pyautogui.screenshot()
+            new_signature = ScreenMatcher.signature(screenshot)
+            if ScreenMatcher.changed(signature, new_signature) or time.time() - last_match >= RECHECK_INTERVAL or \
+                    (gone_since is not None and time.time() - gone_since >= confirm_time):
+                last_match = time.time()
+                if self._locate(name, self.cache.convert(screenshot), confidence) is None:
+                    if gone_since is None:
+                        gone_since = time.time()
+                    elif time.time() - gone_since >= confirm_time:
+                        return True
+                else:
+                    gone_since = None
+                delay = MIN_POLL_INTERVAL
+            else:
+                delay = min(delay * 2, MAX_POLL_INTERVAL)
+            signature = new_signature
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+
+    @staticmethod
+    def signature(screenshot):
+        """Small grayscale thumbnail of a PIL screenshot used to detect screen changes."""
+        return numpy.asarray(screenshot.resize(SIGNATURE_SIZE).convert('L'), dtype=numpy.int16)
+
+    @staticmethod
+    def changed(signature, new_signature):
+        if signature is None or signature.shape != new_signature.shape:
+            return True
+        return numpy.abs(new_signature - signature).max() > SIGNATURE_THRESHOLD
+
+    def _locate(self, name, frame, confidence):
+        height, width = frame.shape[:2]
+        regions = self._regions(name, width, height)
+        for region in regions:
+            box = self._search(name, frame, confidence, region)
+            if box is not None:
+                self.last_hits[name] = box
+                return box
+
+        # full screen search only on a miss, rate limited if a region is configured
+        now = time.time()
+        if name in self.regions and now - self.last_full_search.get(name, 0) < self.full_search_interval:
+            return None
+        self.last_full_search[name] = now
+        box = self._search(name, frame, confidence, None)
+        if box is not None:
+            self.last_hits[name] = box
+            if regions:
+                logging.debug(f"'{name}' found outside of its search region at {box}")
+        return box
+
+    def _regions(self, name, width, height):
+        """Return the pixel regions to search before the full screen: around the last hit and the configured region."""
+        regions = []
+        if name in self.last_hits:
+            left, top, box_width, box_height = self.last_hits[name]
+            margin = max(LAST_HIT_MARGIN, box_width // 2, box_height // 2)
+            regions.append(self._clip(left - margin, top - margin, box_width + 2 * margin,
+                                      box_height + 2 * margin, width, height))
+        if name in self.regions:
+            left, top, region_width, region_height = self.regions[name]
+            regions.append(self._clip(int(left * width), int(top * height), int(region_width * width),
+                                      int(region_height * height), width, height))
+        return regions
+
+    @staticmethod
+    def _clip(left, top, region_width, region_height, width, height):
+        left = min(max(0, int(left)), width - 1)
+        top = min(max(0, int(top)), height - 1)
+        return (left, top, min(int(region_width), width - left), min(int(region_height), height - top))
+
+    def _search(self, name, frame, confidence, region):
+        try:
+            return pyautogui.locate(self.cache.get(name), frame, grayscale=self.cache.grayscale,
+                                    confidence=confidence or self.confidence, region=region)
+        except ImageNotFoundException:
+            return None
+        except ValueError:
+            # template larger than the region
+            return None
+        except Exception as e:
+            logging.error(f"Error locating '{name}' on screen: {e}")
+            return None
+
+    @staticmethod
+    def center(box):
+        return pyautogui.center(box) if box is not None else None
+
+class Tick:
+    """Screenshot shared by all steps of one tick, replaced after the screen was changed by an action."""
+
+    def __init__(self, matcher, frame=None):
+        self.matcher = matcher
+        self.frame = frame
+        self.hits = {}
+
+    def locate(self, name, confidence=None):
+        if self.frame is None:
+            self.frame = self.matcher.grab()
+            self.hits = {}
+        key = (name, confidence)
+        if key not in self.hits:
+            self.hits[key] = self.matcher.locate(name, self.frame, confidence)
+        return self.hits[key]
+
+    def invalidate(self):
+        self.frame = None
@@ -0,0 +1,77 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+BUSY_TIMEOUT_MS = 5000 # wait for a lock of another connection instead of failing with 'database is locked'
+CACHED_STATEMENTS = 256 # prepared statements kept per connection
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+class SQLitePool:
+    """
+    Long-lived SQLite connections, one per thread (and per process, gunicorn
+    forks its workers). Connections use WAL journaling, so readers do not
+    block the writer, synchronous=NORMAL and a busy timeout. connection()
+    yields the connection of the calling thread as a transaction, committed
+    on success and rolled back on an exception.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.local = threading.local()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=BUSY_TIMEOUT_MS / 1000, cached_statements=CACHED_STATEMENTS,
+                               check_same_thread=False)
+        conn.execute('PRAGMA journal_mode = WAL;')
+        conn.execute('PRAGMA synchronous = NORMAL;')
+        conn.execute(f'PRAGMA busy_timeout = {BUSY_TIMEOUT_MS};')
+        return conn
+
+    def get(self):
+        """Connection of the calling thread."""
+        conn = getattr(self.local, 'conn', None)
+        if conn is None or self.local.pid != os.getpid():
+            # connections must not be shared with forked processes
+            conn = self._connect()
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def connection(self):
+        conn = self.get()
+        with conn:
+            yield conn
+
+def get_pool(db_path):
+    """Pool of db_path, shared by all stores using the same database."""
+    with _pools_lock:
+        pool = _pools.get(db_path)
+        if pool is None:
+            pool = _pools[db_path] = SQLitePool(db_path)
+        return pool
+
+def migrate(pool, schema, migrations):
+    """
+    Apply the migrations of schema (e.g. 'events') not applied yet. migrations
+    is the ordered list of SQL scripts (statements separated by ';'), the
+    version of a schema is the number of its scripts applied, stored in table
+    schema_versions. Each script runs in its own transaction, which holds the
+    write lock, so concurrent processes (gunicorn workers) apply it once.
+    """
+    with pool.connection() as conn:
+        conn.execute('CREATE TABLE IF NOT EXISTS schema_versions (schema TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+    while True:
+        with pool.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            row = conn.execute('SELECT version FROM schema_versions WHERE schema = ?', (schema,)).fetchone()
+            version = row[0] if row else 0
+            if version >= len(migrations):
+                return version
+            for statement in migrations[version].split(';'):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute('INSERT OR REPLACE INTO schema_versions (schema, version) VALUES (?, ?)', (schema, version + 1))
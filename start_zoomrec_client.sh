@@ -45,6 +45,30 @@ if [[ "$2" == "$VAAPI" ]]; then
     -e SERVER_URL="$SERVER_URL" \
     -e LEAD_TIME_SEC="$LEAD_TIME_SEC" \
     -e TRAIL_TIME_SEC="$TRAIL_TIME_SEC" \
+    -e ZOOM_PREWARM_SEC="$ZOOM_PREWARM_SEC" \
+    -e ZOOM_READY_TIMEOUT="$ZOOM_READY_TIMEOUT" \
+    -e INPUT_BACKEND="$INPUT_BACKEND" \
+    -e EVENT_WAIT_SEC="$EVENT_WAIT_SEC" \
+    -e EVENT_RETRY_SEC="$EVENT_RETRY_SEC" \
+    -e TEMPLATE_GRAYSCALE="$TEMPLATE_GRAYSCALE" \
+    -e TEMPLATE_SCALE="$TEMPLATE_SCALE" \
+    -e RECORDING_PROFILE="$RECORDING_PROFILE" \
+    -e RECORDING_SEGMENT_MIN="$RECORDING_SEGMENT_MIN" \
+    -e RECORDING_VFR="$RECORDING_VFR" \
+    -e RECORDING_MAX_FPS="$RECORDING_MAX_FPS" \
+    -e RECORDING_KEYFRAME_SEC="$RECORDING_KEYFRAME_SEC" \
+    -e RECORDING_AUDIO="$RECORDING_AUDIO" \
+    -e RECORDING_HEALTH_SEC="$RECORDING_HEALTH_SEC" \
+    -e RECORDING_STOP_TIMEOUT="$RECORDING_STOP_TIMEOUT" \
+    -e STORAGE_MIN_FREE_GB="$STORAGE_MIN_FREE_GB" \
+    -e STORAGE_RETENTION_DAYS="$STORAGE_RETENTION_DAYS" \
+    -e STORAGE_EVICT_OLDEST="$STORAGE_EVICT_OLDEST" \
+    -e STORAGE_STRICT="$STORAGE_STRICT" \
+    -e TRANSCRIBE_BACKEND="$TRANSCRIBE_BACKEND" \
+    -e TRANSCRIBE_API_URL="$TRANSCRIBE_API_URL" \
+    -e POSTPROCESS_WORKERS="$POSTPROCESS_WORKERS" \
+    -e POSTPROCESS_IDLE_ONLY="$POSTPROCESS_IDLE_ONLY" \
+    -e COMPACT_THREADS="$COMPACT_THREADS" \
     -v $ZOOMREC_HOME/recordings:/home/zoomrec/recordings \
     -v $ZOOMREC_HOME/audio:/home/zoomrec/audio \
     -p 5678:5678 \
@@ -81,6 +105,30 @@ elif [[ "$2" == "$NVIDIA" ]]; then
     -e SERVER_URL="$SERVER_URL" \
     -e LEAD_TIME_SEC="$LEAD_TIME_SEC" \
     -e TRAIL_TIME_SEC="$TRAIL_TIME_SEC" \
+    -e ZOOM_PREWARM_SEC="$ZOOM_PREWARM_SEC" \
+    -e ZOOM_READY_TIMEOUT="$ZOOM_READY_TIMEOUT" \
+    -e INPUT_BACKEND="$INPUT_BACKEND" \
+    -e EVENT_WAIT_SEC="$EVENT_WAIT_SEC" \
+    -e EVENT_RETRY_SEC="$EVENT_RETRY_SEC" \
+    -e TEMPLATE_GRAYSCALE="$TEMPLATE_GRAYSCALE" \
+    -e TEMPLATE_SCALE="$TEMPLATE_SCALE" \
+    -e RECORDING_PROFILE="$RECORDING_PROFILE" \
+    -e RECORDING_SEGMENT_MIN="$RECORDING_SEGMENT_MIN" \
+    -e RECORDING_VFR="$RECORDING_VFR" \
+    -e RECORDING_MAX_FPS="$RECORDING_MAX_FPS" \
+    -e RECORDING_KEYFRAME_SEC="$RECORDING_KEYFRAME_SEC" \
+    -e RECORDING_AUDIO="$RECORDING_AUDIO" \
+    -e RECORDING_HEALTH_SEC="$RECORDING_HEALTH_SEC" \
+    -e RECORDING_STOP_TIMEOUT="$RECORDING_STOP_TIMEOUT" \
+    -e STORAGE_MIN_FREE_GB="$STORAGE_MIN_FREE_GB" \
+    -e STORAGE_RETENTION_DAYS="$STORAGE_RETENTION_DAYS" \
+    -e STORAGE_EVICT_OLDEST="$STORAGE_EVICT_OLDEST" \
+    -e STORAGE_STRICT="$STORAGE_STRICT" \
+    -e TRANSCRIBE_BACKEND="$TRANSCRIBE_BACKEND" \
+    -e TRANSCRIBE_API_URL="$TRANSCRIBE_API_URL" \
+    -e POSTPROCESS_WORKERS="$POSTPROCESS_WORKERS" \
+    -e POSTPROCESS_IDLE_ONLY="$POSTPROCESS_IDLE_ONLY" \
+    -e COMPACT_THREADS="$COMPACT_THREADS" \
     -v $ZOOMREC_HOME/recordings:/home/zoomrec/recordings \
     -v $ZOOMREC_HOME/audio:/home/zoomrec/audio \
     -p 5678:5678 \
@@ -107,6 +155,30 @@ else
     -e SERVER_URL="$SERVER_URL" \
     -e LEAD_TIME_SEC="$LEAD_TIME_SEC" \
     -e TRAIL_TIME_SEC="$TRAIL_TIME_SEC" \
+    -e ZOOM_PREWARM_SEC="$ZOOM_PREWARM_SEC" \
+    -e ZOOM_READY_TIMEOUT="$ZOOM_READY_TIMEOUT" \
+    -e INPUT_BACKEND="$INPUT_BACKEND" \
+    -e EVENT_WAIT_SEC="$EVENT_WAIT_SEC" \
+    -e EVENT_RETRY_SEC="$EVENT_RETRY_SEC" \
+    -e TEMPLATE_GRAYSCALE="$TEMPLATE_GRAYSCALE" \
+    -e TEMPLATE_SCALE="$TEMPLATE_SCALE" \
+    -e RECORDING_PROFILE="$RECORDING_PROFILE" \
+    -e RECORDING_SEGMENT_MIN="$RECORDING_SEGMENT_MIN" \
+    -e RECORDING_VFR="$RECORDING_VFR" \
+    -e RECORDING_MAX_FPS="$RECORDING_MAX_FPS" \
+    -e RECORDING_KEYFRAME_SEC="$RECORDING_KEYFRAME_SEC" \
+    -e RECORDING_AUDIO="$RECORDING_AUDIO" \
+    -e RECORDING_HEALTH_SEC="$RECORDING_HEALTH_SEC" \
+    -e RECORDING_STOP_TIMEOUT="$RECORDING_STOP_TIMEOUT" \
+    -e STORAGE_MIN_FREE_GB="$STORAGE_MIN_FREE_GB" \
+    -e STORAGE_RETENTION_DAYS="$STORAGE_RETENTION_DAYS" \
+    -e STORAGE_EVICT_OLDEST="$STORAGE_EVICT_OLDEST" \
+    -e STORAGE_STRICT="$STORAGE_STRICT" \
+    -e TRANSCRIBE_BACKEND="$TRANSCRIBE_BACKEND" \
+    -e TRANSCRIBE_API_URL="$TRANSCRIBE_API_URL" \
+    -e POSTPROCESS_WORKERS="$POSTPROCESS_WORKERS" \
+    -e POSTPROCESS_IDLE_ONLY="$POSTPROCESS_IDLE_ONLY" \
+    -e COMPACT_THREADS="$COMPACT_THREADS" \
     -v $ZOOMREC_HOME/recordings:/home/zoomrec/recordings \
     -v $ZOOMREC_HOME/audio:/home/zoomrec/audio \
     -p 5678:5678 \
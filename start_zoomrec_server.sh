@@ -22,6 +22,10 @@ docker rm $(docker ps -aqf "name=zoomrec_server")
 docker run -d --restart unless-stopped --name zoomrec_server \
     -e DEBUG="$DEBUG" \
     -e LOG_LEVEL="$LOG_LEVEL" \
+    -e GUNICORN_WORKER_CLASS="$GUNICORN_WORKER_CLASS" \
+    -e GUNICORN_WORKERS="$GUNICORN_WORKERS" \
+    -e GUNICORN_THREADS="$GUNICORN_THREADS" \
+    -e GUNICORN_WORKER_CONNECTIONS="$GUNICORN_WORKER_CONNECTIONS" \
     -e TZ="$TZ" \
     -e DOCKER_API_PORT=$DOCKER_API_PORT \
     -e SERVER_USERNAME="$SERVER_USERNAME" \
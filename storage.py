@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import shutil
+import time
+
+SAFETY_FACTOR = 1.2 # estimates are multiplied by this factor
+STATE_FILE = '.storage.json' # measured bitrates per encoder profile
+RECORDING_EXTENSIONS = ('.mkv', '.mp4', '.wav', '.opus', '.srt', '.txt', '.stats', '.vtt', '.json', '.tsv')
+
+class StorageManager:
+    """
+    Keeps enough free space in rec_path for recordings. The space a meeting
+    needs is estimated from its duration and the bitrate of the encoder
+    profile, measured by previous recordings (record_bitrate()) or the
+    profile's nominal bitrate. Recordings older than retention_days are
+    evicted, with evict_oldest also younger ones (oldest first) if space is
+    short. Files protected by is_protected(path) (e.g. queued for
+    postprocessing) are never evicted.
+    """
+
+    def __init__(self, rec_path, min_free_bytes, retention_days=0, evict_oldest=False, is_protected=None):
+        self.rec_path = rec_path
+        self.min_free_bytes = min_free_bytes
+        self.retention_days = retention_days
+        self.evict_oldest = evict_oldest
+        self.is_protected = is_protected or (lambda path: False)
+        self.bitrates = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(os.path.join(self.rec_path, STATE_FILE), 'r') as f:
+                self.bitrates = json.load(f).get('bitrates', {})
+        except (OSError, ValueError):
+            self.bitrates = {}
+
+    def _save(self):
+        try:
+            with open(os.path.join(self.rec_path, STATE_FILE), 'w') as f:
+                json.dump({'bitrates': self.bitrates}, f)
+        except OSError as e:
+            logging.error(f"Error saving storage state: {e}")
+
+    def free_bytes(self):
+        return shutil.disk_usage(self.rec_path).free
+
+    def bitrate(self, profile_name, nominal_bytes_per_sec):
+        """Bytes per second of profile_name: measured if available, otherwise nominal."""
+        return self.bitrates.get(profile_name, nominal_bytes_per_sec)
+
+    def measured(self, profile_name):
+        """True if the bitrate of profile_name was measured by a previous recording."""
+        return profile_name in self.bitrates
+
+    def record_bitrate(self, profile_name, size, seconds):
+        """Remember the bitrate of a finished recording (moving average)."""
+        if seconds <= 0 or size <= 0:
+            return
+        measured = size / seconds
+        previous = self.bitrates.get(profile_name)
+        self.bitrates[profile_name] = measured if previous is None else (previous + measured) / 2
+        self._save()
+        logging.info(f"Recording bitrate of profile '{profile_name}': {measured * 8 / 1000000:.2f} Mbit/s")
+
+    def estimate(self, seconds, bytes_per_sec):
+        return int(seconds * bytes_per_sec * SAFETY_FACTOR)
+
+    def fits(self, needed):
+        return self.free_bytes() - self.min_free_bytes >= needed
+
+    def ensure(self, needed):
+        """Evict recordings by retention policy until needed bytes (plus reserve) are free. Returns True if so."""
+        if self.fits(needed):
+            return True
+        for path in self._candidates():
+            self._evict(path)
+            if self.fits(needed):
+                return True
+        return self.fits(needed)
+
+    def expire(self):
+        """Evict recordings older than retention_days."""
+        if self.retention_days <= 0:
+            return
+        limit = time.time() - self.retention_days * 86400
+        for path in self._candidates(oldest=False):
+            if os.path.getmtime(path) < limit:
+                self._evict(path)
+
+    def _candidates(self, oldest=None):
+        """Evictable recording files, oldest first."""
+        oldest = self.evict_oldest if oldest is None else oldest
+        limit = time.time() - self.retention_days * 86400 if self.retention_days > 0 else None
+        candidates = []
+        for entry in os.listdir(self.rec_path):
+            path = os.path.join(self.rec_path, entry)
+            if entry.startswith('.') or self.is_protected(path):
+                continue
+            if not (entry.lower().endswith(RECORDING_EXTENSIONS) and os.path.isfile(path)):
+                continue
+            mtime = os.path.getmtime(path)
+            if oldest or (limit is not None and mtime < limit):
+                candidates.append((mtime, path))
+        return [path for mtime, path in sorted(candidates)]
+
+    def _evict(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            logging.warning(f"Evicted '{path}' ({size / 1048576:.0f} MB) to free disk space")
+        except OSError as e:
+            logging.error(f"Error evicting '{path}': {e}")
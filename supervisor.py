@@ -0,0 +1,115 @@
+import heapq
+import itertools
+import logging
+import threading
+import time
+from screen_matcher import Tick
+
+DEFAULT_INTERVAL = 10 # seconds between runs of a check
+DEFAULT_PRIORITY = 10 # lower runs first within a tick
+MAX_BACKOFF = 4 # max. factor an interval is stretched when a check exceeds its budget
+COALESCE_WINDOW = 1.0 # checks due within this many seconds share one tick (and screenshot)
+
+class Check:
+    """
+    Periodic check run by the Supervisor. func gets the shared Tick of the run.
+    If a run takes longer than budget seconds the next run is delayed
+    proportionally (up to MAX_BACKOFF times the interval).
+    """
+
+    def __init__(self, name, func, interval=DEFAULT_INTERVAL, priority=DEFAULT_PRIORITY, budget=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.priority = priority
+        self.budget = budget
+        self.runs = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def next_interval(self, duration):
+        self.runs += 1
+        self.total += duration
+        self.max = max(self.max, duration)
+        if self.budget and duration > self.budget:
+            factor = min(MAX_BACKOFF, duration / self.budget)
+            logging.debug(f"Check '{self.name}' took {duration:.2f}s (budget {self.budget}s), next run in {self.interval * factor:.1f}s")
+            return self.interval * factor
+        return self.interval
+
+    def __str__(self):
+        average = self.total / self.runs if self.runs else 0
+        return f"{self.name}: interval: {self.interval}s, runs: {self.runs}, avg: {average * 1000:.1f} ms, max: {self.max * 1000:.1f} ms"
+
+class Supervisor:
+    """
+    Single thread running all in-meeting checks from a timer queue ordered by due
+    time and priority. Checks due within COALESCE_WINDOW run in the same tick and
+    share one screenshot. The supervisor stops once running() returns False or
+    stop() is called, stopped can be waited on.
+    """
+
+    def __init__(self, matcher, running=None):
+        self.matcher = matcher
+        self.running = running or (lambda: True)
+        self.queue = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopped = threading.Event()
+        self.checks = []
+
+    def add(self, *checks, delay=0):
+        due = time.time() + delay
+        with self.lock:
+            for check in checks:
+                self.checks.append(check)
+                heapq.heappush(self.queue, (due, check.priority, next(self.sequence), check))
+        self.wakeup.set()
+
+    def start(self):
+        thread = threading.Thread(target=self.run, args=())
+        thread.daemon = True  # Daemonize thread
+        thread.start()  # Start the execution
+        return self
+
+    def stop(self):
+        self.stopped.set()
+        self.wakeup.set()
+
+    def run(self):
+        while not self.stopped.is_set():
+            with self.lock:
+                due = self.queue[0][0] if self.queue else None
+            delay = due - time.time() if due is not None else None
+            if delay is None or delay > 0:
+                self.wakeup.wait(delay)
+                self.wakeup.clear()
+                continue
+
+            # all checks due now or shortly share one tick
+            with self.lock:
+                batch = []
+                window = time.time() + COALESCE_WINDOW
+                while self.queue and self.queue[0][0] <= window:
+                    batch.append(heapq.heappop(self.queue)[3])
+            batch.sort(key=lambda check: check.priority)
+
+            tick = Tick(self.matcher)
+            for check in batch:
+                if self.stopped.is_set():
+                    break
+                start = time.time()
+                try:
+                    check.func(tick)
+                except Exception as e:
+                    logging.error(f"Check '{check.name}' failed: {e}")
+                duration = time.time() - start
+                with self.lock:
+                    heapq.heappush(self.queue, (time.time() + check.next_interval(duration),
+                                                check.priority, next(self.sequence), check))
+                if not self.running():
+                    self.stop()
+
+    def report(self):
+        return "\n".join(str(check) for check in self.checks)
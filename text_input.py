@@ -0,0 +1,98 @@
+import logging
+import shutil
+import subprocess
+import time
+
+import pyautogui
+
+SLOW_INTERVAL = 0.1 # secs between keystrokes of the pyautogui fallback
+XDOTOOL_DELAY_MS = 12 # delay between keystrokes of xdotool type
+VERIFY_DELAY = 0.2 # secs until a copied field content is in the clipboard
+TIMEOUT = 5
+BACKENDS = ('auto', 'paste', 'xdotool', 'pyautogui')
+
+class TextInput:
+    """
+    Enters text into the focused field. Backends:
+      'paste': text is put into the clipboard (xclip) and pasted with ctrl+v
+      'xdotool': text is typed by xdotool with a short key delay
+      'pyautogui': text is typed by pyautogui key by key (slow)
+    'auto' uses the first available of paste, xdotool and pyautogui. Unless
+    the field is secret (password) the content is read back by selecting and
+    copying it; if it differs the field is cleared and typed slowly.
+    """
+
+    def __init__(self, backend='auto'):
+        self.xdotool = shutil.which('xdotool') is not None
+        self.xclip = shutil.which('xclip') is not None
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown input backend '{backend}', use one of {', '.join(BACKENDS)}")
+        if backend == 'auto':
+            backend = 'paste' if self.xclip else 'xdotool' if self.xdotool else 'pyautogui'
+        elif (backend == 'paste' and not self.xclip) or (backend == 'xdotool' and not self.xdotool):
+            logging.error(f"Input backend '{backend}' not available, using pyautogui")
+            backend = 'pyautogui'
+        self.backend = backend
+        logging.info(f"Input backend: {self.backend}")
+
+    def write(self, text, secret=False):
+        """Enter text into the focused field, returns True if fast input was used and verified."""
+        if self.backend != 'pyautogui':
+            try:
+                self._fast_write(text)
+                if secret:
+                    if self.backend == 'paste':
+                        self._set_clipboard('')
+                    return True
+                content = self.read_field()
+                # cannot be verified without xclip, zoom groups the digits of meeting ids
+                if content is None or content.replace(' ', '') == text.replace(' ', ''):
+                    return True
+                logging.warning("Field content differs after fast input, typing slowly")
+            except (OSError, subprocess.SubprocessError) as e:
+                logging.warning(f"Fast input failed: {e}, typing slowly")
+            self.clear_field()
+        pyautogui.write(text, interval=SLOW_INTERVAL)
+        return False
+
+    def press(self, *keys):
+        """Press keys one after another, e.g. press('tab', 'tab', 'space')."""
+        if self.backend != 'pyautogui' and self.xdotool:
+            try:
+                subprocess.run(['xdotool', 'key', '--delay', str(XDOTOOL_DELAY_MS)] + [key_name(key) for key in keys],
+                               check=True, timeout=TIMEOUT)
+                return
+            except (OSError, subprocess.SubprocessError) as e:
+                logging.warning(f"xdotool key failed: {e}")
+        for key in keys:
+            pyautogui.press(key)
+
+    def _fast_write(self, text):
+        if self.backend == 'paste':
+            self._set_clipboard(text)
+            pyautogui.hotkey('ctrl', 'v')
+        else:
+            subprocess.run(['xdotool', 'type', '--delay', str(XDOTOOL_DELAY_MS), '--', text], check=True, timeout=TIMEOUT)
+
+    def read_field(self):
+        """Content of the focused field (selected and copied to the clipboard) or None."""
+        if not self.xclip:
+            return None
+        self._set_clipboard('')
+        pyautogui.hotkey('ctrl', 'a')
+        pyautogui.hotkey('ctrl', 'c')
+        time.sleep(VERIFY_DELAY)
+        pyautogui.press('end')
+        result = subprocess.run(['xclip', '-selection', 'clipboard', '-o'], capture_output=True, text=True, timeout=TIMEOUT)
+        return result.stdout if result.returncode == 0 else None
+
+    def clear_field(self):
+        pyautogui.hotkey('ctrl', 'a')
+        pyautogui.press('backspace')
+
+    def _set_clipboard(self, text):
+        subprocess.run(['xclip', '-selection', 'clipboard', '-i'], input=text, text=True, check=True, timeout=TIMEOUT)
+
+def key_name(key):
+    """xdotool keysym of a pyautogui key name."""
+    return {'tab': 'Tab', 'space': 'space', 'enter': 'Return', 'backspace': 'BackSpace', 'end': 'End'}.get(key, key)
@@ -0,0 +1,178 @@
+import logging
+import os
+import re
+import subprocess
+import tempfile
+import threading
+import wave
+from recording import completed_segments
+
+SAMPLE_RATE = 16000 # whisper works on 16 kHz mono audio
+POLL_INTERVAL = 10 # seconds between checks for completed segments
+TAIL_CHUNK_SEC = 600 # the rest of the recording is transcribed in chunks of this length (API upload limits)
+SRT_TIME = re.compile(r"(\d+):(\d+):(\d+)[,.](\d+)")
+
+def parse_srt(path):
+    """Return the cues of a SubRip file as list of (start, end, text), times in seconds."""
+    cues = []
+    with open(path, 'r', encoding='utf-8') as f:
+        blocks = f.read().strip().split('\n\n')
+    for block in blocks:
+        lines = block.strip().splitlines()
+        for index, line in enumerate(lines):
+            if '-->' in line:
+                start, end = [srt_seconds(time) for time in line.split('-->')]
+                cues.append((start, end, ' '.join(lines[index + 1:]).strip()))
+                break
+    return cues
+
+def srt_seconds(time):
+    hours, minutes, seconds, millis = SRT_TIME.search(time).groups()
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds) + int(millis.ljust(3, '0')[:3]) / 1000
+
+def srt_time(seconds):
+    millis = int(round(seconds * 1000))
+    return f"{millis // 3600000:02d}:{millis // 60000 % 60:02d}:{millis // 1000 % 60:02d},{millis % 1000:03d}"
+
+class WhisperApiBackend:
+    """Transcribes with whisper-ctranslate2-remote-api (as transcribe_video.sh does)."""
+
+    def __init__(self, api_url):
+        self.api_url = api_url
+
+    def transcribe(self, audio_file):
+        output_dir = os.path.dirname(audio_file)
+        subprocess.run(['whisper-ctranslate2-remote-api', audio_file, '--output_dir', output_dir,
+                        '--output_format', 'srt', '--faster_whisper_api_base_url', self.api_url],
+                       check=True, capture_output=True)
+        srt_file = os.path.splitext(audio_file)[0] + '.srt'
+        cues = parse_srt(srt_file)
+        os.remove(srt_file)
+        return cues
+
+class StubBackend:
+    """Returns one cue per chunk without transcribing, for testing the pipeline."""
+
+    def transcribe(self, audio_file):
+        with wave.open(audio_file, 'rb') as f:
+            duration = f.getnframes() / f.getframerate()
+        return [(0.0, duration, f"[{os.path.basename(audio_file)}]")]
+
+def create_backend(name, api_url=None):
+    if name == 'stub':
+        return StubBackend()
+    return WhisperApiBackend(api_url)
+
+class StreamingTranscriber:
+    """
+    Transcribes a segmented recording while it is running: every segment
+    completed by ffmpeg is converted into a 16 kHz mono chunk and passed to
+    the backend, cues are shifted by the duration of the previous chunks.
+    stop() ends the transcription of segments when ffmpeg stopped, finish()
+    (run by a postprocessing worker) transcribes the rest of the final
+    recording from the end of the last chunk and writes '<recording>.srt' and
+    '<recording>.txt'. Segments which failed are listed in failed, the
+    transcript is then incomplete and finish() returns None.
+    """
+
+    def __init__(self, filename, backend, poll_interval=POLL_INTERVAL):
+        self.filename = filename
+        self.backend = backend
+        self.poll_interval = poll_interval
+        self.done = []
+        self.failed = []
+        self.offset = 0.0
+        self.cues = []
+        self.stopped = threading.Event()
+        self.reading = threading.Lock() # held while a segment is read
+        self.thread = threading.Thread(target=self.run, args=())
+        self.thread.daemon = True  # Daemonize thread
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        while not self.stopped.wait(self.poll_interval):
+            for segment in completed_segments(self.filename):
+                if self.stopped.is_set():
+                    break
+                if segment in self.done:
+                    continue
+                self.done.append(segment)
+                try:
+                    self.transcribe_segment(segment)
+                except Exception as e:
+                    self.failed.append(segment)
+                    logging.error(f"Transcribing segment '{segment}' failed: {e}")
+
+    def transcribe_segment(self, segment):
+        with self.reading:
+            audio_file = extract_audio(segment)
+        self.transcribe_audio(audio_file, segment)
+
+    def transcribe_audio(self, audio_file, name):
+        """Transcribe the chunk audio_file (removed afterwards), returns its duration."""
+        offset = self.offset
+        duration = None
+        try:
+            with wave.open(audio_file, 'rb') as f:
+                duration = f.getnframes() / f.getframerate()
+            cues = self.backend.transcribe(audio_file) if duration > 0 else []
+        finally:
+            os.remove(audio_file)
+            # later cues stay in place even if this chunk failed
+            if duration is not None:
+                self.offset += duration
+        self.cues.extend((start + offset, end + offset, text) for start, end, text in cues)
+        logging.debug(f"Transcribed '{name}' ({duration:.0f}s, {len(cues)} cues)")
+        return duration
+
+    def stop(self):
+        """Stop transcribing segments (ffmpeg stopped), returns once no segment is read anymore."""
+        self.stopped.set()
+        with self.reading:
+            pass
+
+    def finish(self):
+        """
+        Transcribe the final recording from the end of the last chunk and write the
+        transcript files. Returns the srt file or None if a chunk failed.
+        """
+        self.stop()
+        if self.thread.is_alive():
+            self.thread.join()
+        if self.failed:
+            logging.error(f"Transcription incomplete, {len(self.failed)} segments failed")
+            return None
+        while True:
+            audio_file = extract_audio(self.filename, start=self.offset, duration=TAIL_CHUNK_SEC)
+            if self.transcribe_audio(audio_file, f"{self.filename} at {self.offset:.0f}s") < TAIL_CHUNK_SEC - 1:
+                break
+
+        base = os.path.splitext(self.filename)[0]
+        with open(base + '.srt', 'w', encoding='utf-8') as f:
+            for index, (start, end, text) in enumerate(self.cues, 1):
+                f.write(f"{index}\n{srt_time(start)} --> {srt_time(end)}\n{text}\n\n")
+        with open(base + '.txt', 'w', encoding='utf-8') as f:
+            f.write('\n'.join(text for start, end, text in self.cues) + '\n')
+        logging.info(f"Transcript with {len(self.cues)} cues written to '{base}.srt'")
+        return base + '.srt'
+
+def extract_audio(filename, start=0, duration=None):
+    """Convert (a part of) filename into a temporary 16 kHz mono wav file, returns its path."""
+    fd, audio_file = tempfile.mkstemp(suffix='.wav')
+    os.close(fd)
+    command = ['ffmpeg', '-nostats', '-loglevel', 'error', '-y']
+    if start:
+        command += ['-ss', f"{start:.3f}"]
+    command += ['-i', filename]
+    if duration:
+        command += ['-t', str(duration)]
+    command += ['-vn', '-ac', '1', '-ar', str(SAMPLE_RATE), '-acodec', 'pcm_s16le', audio_file]
+    try:
+        subprocess.run(command, check=True, capture_output=True)
+    except Exception:
+        os.remove(audio_file)
+        raise
+    return audio_file
@@ -1,4 +1,4 @@
-import sqlite3
+from sqlite_pool import get_pool, migrate
 import shortuuid
 from enum import Enum
 from abc import ABC, abstractmethod
@@ -145,33 +145,36 @@ class Users(ABC):
         return user
 
 
+# Schema migrations of the users table, applied in order (never change an applied one, append a new one)
+# IMPORTANT: order of field needs to align with UserField order
+USER_MIGRATIONS = [
+    f'''
+    CREATE TABLE IF NOT EXISTS users (
+        {UserField.KEY.value} TEXT PRIMARY KEY,
+        {UserField.NAME.value} TEXT NOT NULL,
+        {UserField.LOGIN.value} TEXT NOT NULL UNIQUE,
+        {UserField.PASSWORD.value} TEXT NOT NULL,
+        {UserField.TWO_FA_KEY.value} TEXT,
+        {UserField.EMAIL.value} TEXT,
+        {UserField.MESSENGER.value} TEXT,
+        {UserField.MOBILE_NUMBER.value} TEXT,
+        {UserField.SFTP_USERNAME.value} TEXT,
+        {UserField.ROLE.value} INTEGER NOT NULL,
+        {UserField.CREATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        {UserField.LAST_UPDATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+]
+
 class SQLLiteUser(Users):
     def __init__(self, db_path, stateChanged=None):
         self.db_path = db_path
+        self.pool = get_pool(db_path)  # connections shared with the other stores of db_path
         self.stateChanged = stateChanged  # Initialize the callback
         self._initialize_db()
 
     def _initialize_db(self):
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            # IMPORTANT: order of field needs to align with EventFields order
-            cursor.execute(f'''
-                CREATE TABLE IF NOT EXISTS users (
-                    {UserField.KEY.value} TEXT PRIMARY KEY,
-                    {UserField.NAME.value} TEXT NOT NULL,
-                    {UserField.LOGIN.value} TEXT NOT NULL UNIQUE,
-                    {UserField.PASSWORD.value} TEXT NOT NULL,
-                    {UserField.TWO_FA_KEY.value} TEXT,
-                    {UserField.EMAIL.value} TEXT,
-                    {UserField.MESSENGER.value} TEXT,
-                    {UserField.MOBILE_NUMBER.value} TEXT,
-                    {UserField.SFTP_USERNAME.value} TEXT,
-                    {UserField.ROLE.value} INTEGER NOT NULL,
-                    {UserField.CREATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    {UserField.LAST_UPDATED_TIMESTAMP.value} TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            conn.commit()
+        migrate(self.pool, 'users', USER_MIGRATIONS)
 
     def create(self, user):
         user = Users.clean(user)
@@ -183,14 +186,13 @@ class SQLLiteUser(Users):
         # Validate user data
         user = Users.validate(user)
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f'''
                 INSERT INTO users (
                     {", ".join(user.keys())}
                 ) VALUES ({", ".join("?" for _ in user)})
             ''', list(user.values()))
-            conn.commit()
 
         # Check for changes and call the callback if necessary
         old_user = {}
@@ -200,7 +202,7 @@ class SQLLiteUser(Users):
         return user
 
     def get(self, user_key=None, filters=None):
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             conditions = []
             parameters = []
@@ -238,13 +240,12 @@ class SQLLiteUser(Users):
         user[UserField.LAST_UPDATED_TIMESTAMP.value] = datetime.now()
         user = Users.validate(user)
         old_user = self.get(user[UserField.KEY.value])
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             set_clause = ", ".join(f"{field} = ?" for field in user.keys())
             cursor.execute(f'''
                 UPDATE users SET {set_clause} WHERE {UserField.KEY.value} = ?
             ''', list(user.values()) + [user[UserField.KEY.value]])
-            conn.commit()
         
         # Check for changes and call the callback if necessary
         if self.stateChanged and old_user != user:
@@ -255,10 +256,9 @@ class SQLLiteUser(Users):
 
     def delete(self, user_key):
         old_user = self.get(user_key)
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute(f'DELETE FROM users WHERE {UserField.KEY.value} = ?', (user_key,))
-            conn.commit()
 
         # Check for changes and call the callback if necessary
         user = {}
@@ -1,20 +1,30 @@
 import logging
 import os
-import psutil 
 import pyautogui  # later zoom versions do not start anymore when pyautogui is imported, Zoom  5.13.0 (599) still works
-from pyautogui import ImageNotFoundException
 import random
 import signal
 import subprocess
-import threading
 import time
 import datetime
-import atexit
+import yaml
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from events import Events, EventType, EventField, EventStatus, EventInstructionAttribute
 import debugpy
-from events_api import delete_event_api, update_event_api, get_event_api  # Ensure you import the function
+from events_api import delete_event_api, update_event_api, get_event_api, get_event_changes_api, post_event_log_api  # Ensure you import the function
 from utilities import convert_to_safe_filename
+from screen_matcher import ScreenMatcher, TemplateCache
+from screen_flow import compile_flows
+from supervisor import Supervisor, Check
+from meeting_end import create_detectors
+from process_registry import ProcessRegistry
+from recording import segment_output, finalize_segments, recover_segments, vfr_output_params, FfmpegProgress, RecordingHealth, PROGRESS_PARAMS
+from encoder_profiles import ProfileSelector, SlowEncodingDetector, find_profile
+from transcription import StreamingTranscriber, create_backend
+from postprocess_queue import PostprocessQueue
+from storage import StorageManager
+from join_trace import JoinTrace
+from text_input import TextInput
 
 UC_CONNECTED_POPUPS = 0
 UC_CONNECTED_NOPOPUPS = 1
@@ -41,6 +51,7 @@ IMG_PATH = os.path.join(BASE_PATH, "img")
 REC_PATH = os.path.join(BASE_PATH, "recordings")
 AUDIO_PATH = os.path.join(BASE_PATH, "audio")
 DEBUG_PATH = os.path.join(REC_PATH, "screenshots")
+JOIN_TRACE_FILE = os.path.join(DEBUG_PATH, "join_trace.jsonl") # per-step timings of every join (JSON lines)
 
 FFMPEG_INPUT_PARAMS = os.getenv('FFMPEG_INPUT_PARAMS')
 FFMPEG_OUTPUT_PARAMS = os.getenv('FFMPEG_OUTPUT_PARAMS')
@@ -53,13 +64,59 @@ def getIntEnv( env_str, default_value):
         val_str = os.getenv(env_str)
         if val_str:
             int_val = int(val_str)
-    except ValueError or TypeError:
+    except (ValueError, TypeError):
         logging.error(f"error converting env {env_str} value {val_str} to integer. Default value {default_value} used.")
 
     return int_val
 
+def getFloatEnv( env_str, default_value):
+    float_val = default_value
+    try:
+        val_str = os.getenv(env_str)
+        if val_str:
+            float_val = float(val_str)
+    except (ValueError, TypeError):
+        logging.error(f"error converting env {env_str} value {val_str} to float. Default value {default_value} used.")
+
+    return float_val
+
 LEAD_TIME_SEC = getIntEnv( 'LEAD_TIME_SEC', 60) # start meeting x secs before official start date
 TRAIL_TIME_SEC = getIntEnv( 'TRAIL_TIME_SEC', 300) # end meeting x secs after official end date
+ZOOM_PREWARM_SEC = getIntEnv( 'ZOOM_PREWARM_SEC', 0) # start zoom x secs before the start window of the next meeting (0: start on join)
+ZOOM_READY_TIMEOUT = getIntEnv( 'ZOOM_READY_TIMEOUT', 60) # secs a pre-warmed zoom may take until it is ready
+EVENT_WAIT_SEC = getIntEnv( 'EVENT_WAIT_SEC', 55) # max secs the server holds a request for event changes (0: poll every minute)
+EVENT_RETRY_SEC = getIntEnv( 'EVENT_RETRY_SEC', 10) # secs before retrying after an error getting event changes
+INPUT_BACKEND = os.getenv('INPUT_BACKEND') or 'auto' # text input: 'paste', 'xdotool', 'pyautogui' or 'auto'
+RECORDING_SEGMENT_MIN = getIntEnv( 'RECORDING_SEGMENT_MIN', 0) # record in segments of x minutes (0: single file)
+RECORDING_PROFILE = os.getenv('RECORDING_PROFILE', '') # encoder profile name, 'auto' (benchmark) or empty for FFMPEG_*_PARAMS
+RECORDING_VFR = True if os.getenv('RECORDING_VFR', '').lower() in ('1', 'true', 'yes') else False # drop duplicate frames
+RECORDING_MAX_FPS = getIntEnv( 'RECORDING_MAX_FPS', 0) # capture framerate (0: of the encoder profile)
+RECORDING_KEYFRAME_SEC = getIntEnv( 'RECORDING_KEYFRAME_SEC', 10) # seconds between key frames with RECORDING_VFR
+RECORDING_HEALTH_SEC = getIntEnv( 'RECORDING_HEALTH_SEC', 30) # seconds between recording health checks
+EVENT_LOG_TIMEOUT = 30 # secs posting to the event log may take
+RECORDING_STOP_TIMEOUT = getIntEnv( 'RECORDING_STOP_TIMEOUT', 600) # secs ffmpeg may take to finish the recording before it is killed (0: no limit)
+RECORDING_AUDIO = os.getenv('RECORDING_AUDIO', '') # also record audio only for transcription: 'wav' (16 kHz PCM) or 'opus'
+
+# disk space of recordings
+STORAGE_MIN_FREE_GB = getFloatEnv( 'STORAGE_MIN_FREE_GB', 2) # free space kept in REC_PATH
+STORAGE_RETENTION_DAYS = getIntEnv( 'STORAGE_RETENTION_DAYS', 0) # evict recordings older than x days (0: keep)
+STORAGE_EVICT_OLDEST = True if os.getenv('STORAGE_EVICT_OLDEST', '').lower() in ('1', 'true', 'yes') else False # evict oldest recordings if space is short
+STORAGE_DEFAULT_MBIT = getFloatEnv( 'STORAGE_DEFAULT_MBIT', 40) # estimated bitrate of FFMPEG_OUTPUT_PARAMS (default lossless)
+STORAGE_STRICT = True if os.getenv('STORAGE_STRICT', '').lower() in ('1', 'true', 'yes') else False # don't record if an unmeasured estimate doesn't fit
+
+# separate audio output (16 kHz mono as needed by whisper) written in parallel to the recording
+AUDIO_OUTPUT_PARAMS = {
+    'wav': "-acodec pcm_s16le",
+    'opus': "-acodec libopus -b:a 24k"
+}
+
+# transcription of segmented recordings while recording (postprocess 'transcribe')
+TRANSCRIBE_BACKEND = os.getenv('TRANSCRIBE_BACKEND') or 'whisper' # 'whisper' or 'stub' for testing
+TRANSCRIBE_API_URL = os.getenv('TRANSCRIBE_API_URL') or 'http://broadwell-server.local:9876/api/v0'
+
+POSTPROCESS_WORKERS = getIntEnv( 'POSTPROCESS_WORKERS', 0) # parallel postprocessing jobs (0: half the CPUs)
+# postprocessing commands only run while no meeting is joined, paused when one starts
+POSTPROCESS_IDLE_ONLY = [command.strip() for command in (os.getenv('POSTPROCESS_IDLE_ONLY') or 'compact').split(',') if command.strip()]
 
 # client mode (get meetings from server)
 SERVER_USERNAME = os.getenv('SERVER_USERNAME')
@@ -103,218 +160,160 @@ logLevel = getattr(logging, os.getenv( "LOG_LEVEL", "INFO"), logging.INFO)
 # Configure the logging
 logging.basicConfig(filename=log_file, format='%(asctime)s %(levelname)s %(message)s', level=logLevel)
 
-def wrap(func, *args, **kwargs):
-    try:
-        result = func(*args, **kwargs)
-        return result
-    except ImageNotFoundException as e:
-        # print(f"Image not found: {e}")
-        return None
-    except Exception as e:
-        print(f"An unexpected exception occurred: {e}")
-        # Handle the exception or log it as needed
-        return None  # You can customize this return value based on your requirements
+# template images are decoded once at startup (optionally as grayscale and/or pre-scaled)
+TEMPLATE_GRAYSCALE = True if os.getenv('TEMPLATE_GRAYSCALE', '').lower() in ('1', 'true', 'yes') else False
+TEMPLATE_SCALE = getFloatEnv( 'TEMPLATE_SCALE', 1.0) # scale factor if display differs from the screenshots in IMG_PATH
+TEMPLATE_CACHE = TemplateCache(IMG_PATH, grayscale=TEMPLATE_GRAYSCALE, scale=TEMPLATE_SCALE)
 
+# screen control configuration
+ZOOM_CONFIG_PATH = os.path.join(BASE_PATH, "zoom.yaml")
+ZOOM_CONFIG = {}
+try:
+    with open(ZOOM_CONFIG_PATH, "r") as f:
+        ZOOM_CONFIG = yaml.safe_load(f) or {}
+except (OSError, yaml.YAMLError) as e:
+    logging.error(f"Error loading screen control configuration '{ZOOM_CONFIG_PATH}': {e}")
 
+# all template searches go through the matcher, watchdog threads share one screenshot per check
+SCREEN_MATCHER = ScreenMatcher(TEMPLATE_CACHE, 
+    regions=ZOOM_CONFIG.get('SearchRegions'), 
+    full_search_interval=ZOOM_CONFIG.get('FullScreenSearchInterval', 60))
 
-class BackgroundThread:
+# screen flows of zoom.yaml compiled once, eval steps run in the namespace of this module
+SCREEN_FLOWS = compile_flows(ZOOM_CONFIG, SCREEN_MATCHER, globals())
+BACKGROUND_FLOW = SCREEN_FLOWS.get('Background')
+HIDE_VIEW_OPTIONS_FLOW = SCREEN_FLOWS.get('HideViewOptions')
 
-    def __init__(self, interval=10):
-        # Sleep interval between
-        self.interval = interval
+# default cadence (seconds) and cost budget (seconds) of in-meeting checks, steps in zoom.yaml can override
+CHECK_INTERVAL = ZOOM_CONFIG.get('CheckInterval', 10)
+CHECK_BUDGET = ZOOM_CONFIG.get('CheckBudget')
 
-        thread = threading.Thread(target=self.run, args=())
-        thread.daemon = True  # Daemonize thread
-        thread.start()  # Start the execution
+# meeting end detectors (zoom process, meeting window, audio stream) besides the meeting ended dialogs
+END_DETECTION = ZOOM_CONFIG.get('EndDetection')
 
-    def run(self):
-        global ONGOING_MEETING
-        ONGOING_MEETING = True
-
-        logging.info("Check continuously if meeting has ended..")
-
-        while ONGOING_MEETING:
-
-            # Check if recording
-            if (wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'meeting_is_being_recorded.png'), confidence=0.9,
-                                               minSearchTime=2) is not None):
-                logging.info("This meeting is being recorded..")
-                try:
-                    x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                        IMG_PATH, 'got_it.png'), confidence=0.9)
-                    pyautogui.click(x, y)
-                    logging.info("Accepted recording..")
-                except TypeError:
-                    logging.error("Could not accept recording!")
-
-            # Check if ended
-            if (wrap( pyautogui.locateOnScreen, os.path.join(IMG_PATH, 'meeting_ended_by_host_1.png'),
-                                         confidence=0.9) is not None or wrap( pyautogui.locateOnScreen, 
-                os.path.join(IMG_PATH, 'meeting_ended_by_host_2.png'), confidence=0.9) is not None):
-                ONGOING_MEETING = False
-                logging.info("Meeting ended by host..")
-
-            # Check if crash report window shows
-            if (wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'zoom_crash_report_not_send.png'), confidence=0.9,
-                                               minSearchTime=2) is not None):
-                logging.info("Zoom unexpectedly crashed..")
-                try:
-                    x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                        IMG_PATH, 'zoom_crash_report_not_send.png'), confidence=0.9)
-                    pyautogui.click(x, y)
-                    logging.info("Close crash report window by not sending..")
-                except TypeError:
-                    logging.error("Could not close crash report window!")
-
-            # Check "an unknown error occured" option "close" or "join from browser"
-            if (wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'unknown_error_occurred.png'), confidence=0.9,
-                                               minSearchTime=2) is not None):
-                logging.info("Zoom unknown error occured..")
-                try:
-                    x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                        IMG_PATH, 'unknown_error_close.png'), confidence=0.9)
-                    pyautogui.click(x, y)
-                    logging.info("Close window unknown error occured..")
-                except TypeError:
-                    logging.error("Could not close unknown error occured window!")
-
-            time.sleep(self.interval)
-
-class HideViewOptionsThread:
-
-    def __init__(self, description, interval=10):
-        # Sleep interval between
-        self.description = description
-        self.interval = interval
-
-        thread = threading.Thread(target=self.run, args=())
-        thread.daemon = True  # Daemonize thread
-        thread.start()  # Start the execution
-
-    def run(self):
-        global VIDEO_PANEL_HIDED
-    
-        logging.info("Checking continuously if screensharing, polls or chats need hiding..")
-        while ONGOING_MEETING:
-            # Check if host is sharing poll results
-            if (wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'host_is_sharing_poll_results.png'),
-                                               confidence=0.9,
-                                               minSearchTime=2) is not None):
-                logging.info("Host is sharing poll results..")
-                try:
-                    x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                        IMG_PATH, 'host_is_sharing_poll_results.png'), confidence=0.9)
-                    pyautogui.click(x, y)
-                    try:
-                        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                            IMG_PATH, 'exit.png'), confidence=0.9)
-                        pyautogui.click(x, y)
-                        logging.info("Closed poll results window..")
-                    except TypeError:
-                        logging.error("Could not exit poll results window!")
-                        if logging.getLogger().level == logging.DEBUG:
-                            pyautogui.screenshot(os.path.join(DEBUG_PATH, time.strftime(
-                                TIME_FORMAT) + "-" + self.description) + "_close_poll_results_error.png")
-                except TypeError:
-                    logging.error("Could not find poll results window anymore!")
-                    if logging.getLogger().level == logging.DEBUG:
-                        pyautogui.screenshot(os.path.join(DEBUG_PATH, time.strftime(
-                            TIME_FORMAT) + "-" + self.description) + "_find_poll_results_error.png")
-
-            # Check if view options available
-            if wrap( pyautogui.locateOnScreen, os.path.join(IMG_PATH, 'view_options.png'), confidence=0.9) is not None:
-                if not VIDEO_PANEL_HIDED:
-                    logging.info("Screensharing active..")
-                    try:
-                        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                            IMG_PATH, 'view_options.png'), confidence=0.9)
-                        pyautogui.click(x, y)
-                        time.sleep(1)
-                        # Hide video panel
-                        if wrap( pyautogui.locateOnScreen, os.path.join(IMG_PATH, 'show_video_panel.png'),
-                                                    confidence=0.9) is not None:
-                            # Leave 'Show video panel' and move mouse from screen
-                            pyautogui.moveTo(0, 100)
-                            pyautogui.click(0, 100)
-                            VIDEO_PANEL_HIDED = True
-                            logging.info("Video panel hidden successfully..")
-                        else:
-                            try:
-                                x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                                    IMG_PATH, 'hide_video_panel.png'), confidence=0.9) 
-                                pyautogui.click(x, y)
-                                # Move mouse from screen
-                                pyautogui.moveTo(0, 100)
-                                VIDEO_PANEL_HIDED = True
-                                logging.info("Video panel hidden successfully..")
-                            except TypeError:
-                                logging.error("Could not hide video panel!")
-                    except TypeError:
-                        logging.error("Could not find view options!")
-
-            # Check if meeting chat is on screen
-            if wrap( pyautogui.locateOnScreen, os.path.join(IMG_PATH, 'meeting_chat.png'), confidence=0.9) is not None:
-                logging.info("Meeting chat popup window detected..")
-                # try to close window
-                x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                            IMG_PATH, 'exit.png'), confidence=0.9)
-                pyautogui.click(x, y)
-                time.sleep(1)
-                if wrap( pyautogui.locateOnScreen, os.path.join(IMG_PATH, 'meeting_chat.png'), confidence=0.9):
-                    logging.info("Failed to close meeting chat popup window..")
-        
-                else:
-                    logging.info("Successfully close meeting chat popup window..")
-
-             # Check if "participant has enabled closed caption" message showing
-            if wrap( pyautogui.locateOnScreen, os.path.join(IMG_PATH, 'participant_enabled_closed_caption.png'), confidence=0.9) is not None:
-                logging.info("Message for participant has enabled closed caption showing..")
-                # try to close window
-                x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                            IMG_PATH, 'participant_enabled_closed_caption_close.png'), confidence=0.9)
+# zoom, ffmpeg and postprocess processes spawned by zoomrec
+PROCESSES = ProcessRegistry()
+
+# typing into the fields of zoom
+TEXT_INPUT = TextInput(INPUT_BACKEND)
+
+def check_view_options(tick):
+    global VIDEO_PANEL_HIDED
+
+    # Check if view options available
+    if VIDEO_PANEL_HIDED or tick.locate('view_options.png') is None:
+        return
+    logging.info("Screensharing active..")
+    try:
+        x, y = ScreenMatcher.center(tick.locate('view_options.png'))
+        pyautogui.click(x, y)
+        tick.invalidate()
+        time.sleep(1)
+        # Hide video panel
+        if tick.locate('show_video_panel.png') is not None:
+            # Leave 'Show video panel' and move mouse from screen
+            pyautogui.moveTo(0, 100)
+            pyautogui.click(0, 100)
+            VIDEO_PANEL_HIDED = True
+            logging.info("Video panel hidden successfully..")
+        else:
+            try:
+                x, y = ScreenMatcher.center(tick.locate('hide_video_panel.png'))
                 pyautogui.click(x, y)
-                time.sleep(1)
-                if wrap( pyautogui.locateOnScreen, os.path.join(IMG_PATH, 'meeting_chat.png'), confidence=0.9):
-                    logging.info("Failed to close message for participant has enabled closed caption...")
-                else:
-                    logging.info("Successfully closed message for participant has enabled closed caption..")
+                # Move mouse from screen
+                pyautogui.moveTo(0, 100)
+                VIDEO_PANEL_HIDED = True
+                logging.info("Video panel hidden successfully..")
+            except TypeError:
+                logging.error("Could not hide video panel!")
+    except TypeError:
+        logging.error("Could not find view options!")
+    tick.invalidate()
 
-            time.sleep(self.interval)
-       
-def check_connecting(zoom_pid, start_date, duration):
-    # Check if connecting
-    check_periods = 0
-    connecting = False
+def end_detection_check(name, interval, detector):
+    def check(tick):
+        global ONGOING_MEETING
+        reason = detector.check()
+        if reason and ONGOING_MEETING:
+            logging.info(f"Meeting ended: {reason}")
+            ONGOING_MEETING = False
+    return Check(f"end_detection.{name}", check, interval, priority=0)
+
+def start_supervisor(zoom):
+    """
+    Start the in-meeting supervisor running the Background checks of zoom.yaml
+    (meeting ended, recording notice, crash report, unknown error) and the
+    EndDetection checks until the meeting has ended.
+    """
+    global ONGOING_MEETING
+    ONGOING_MEETING = True
+
+    logging.info("Check continuously if meeting has ended..")
+    supervisor = Supervisor(SCREEN_MATCHER, running=lambda: ONGOING_MEETING)
+    if BACKGROUND_FLOW:
+        supervisor.add(*BACKGROUND_FLOW.checks(CHECK_INTERVAL, CHECK_BUDGET))
+    for name, interval, detector in create_detectors(END_DETECTION, zoom):
+        supervisor.add(end_detection_check(name, interval, detector))
+    return supervisor.start()
+
+def add_hide_view_options_checks(supervisor):
+    """Add the checks if screensharing, polls or chats need hiding (HideViewOptions of zoom.yaml)."""
+    logging.info("Checking continuously if screensharing, polls or chats need hiding..")
+    supervisor.add(Check('view_options', check_view_options, CHECK_INTERVAL, budget=CHECK_BUDGET))
+    if HIDE_VIEW_OPTIONS_FLOW:
+        supervisor.add(*HIDE_VIEW_OPTIONS_FLOW.checks(CHECK_INTERVAL, CHECK_BUDGET))
+
+def remaining_seconds(start_date, duration):
+    return max(0, duration - (datetime.now() - start_date).total_seconds())
+
+def check_connecting(start_date, duration):
     # Check if connecting
-    if wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'connecting.png'), confidence=0.9) is not None:
-        connecting = True
-        logging.info("Connecting..")
+    if SCREEN_MATCHER.locate_center('connecting.png') is None:
+        return
+    logging.info("Connecting..")
 
-    # Wait while connecting
+    # Wait while connecting (reacts on screen changes)
     # Exit when meeting ends after time
-    while connecting:
-        if (datetime.now() - start_date).total_seconds() > duration:
-            logging.info("Meeting ended after time!")
-            logging.info("Exit Zoom!")
-            os.killpg(os.getpgid(zoom_pid), signal.SIGQUIT)
-            return
+    if SCREEN_MATCHER.wait_until_gone('connecting.png', timeout=remaining_seconds(start_date, duration)):
+        logging.info("Not connecting anymore..")
+        return
+
+    logging.info("Meeting ended after time!")
+    logging.info("Exit Zoom!")
+    PROCESSES.stop('zoom')
 
-        if wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'connecting.png'), confidence=0.9) is None:
-            logging.info("Maybe not connecting anymore..")
-            check_periods += 1
-            if check_periods >= 2:
-                connecting = False
-                logging.info("Not connecting anymore..")
-                return
-        time.sleep(2)
 
+def is_join_by_url(event):
+    return event[EventField.URL.value].startswith('https://') or event[EventField.URL.value].startswith('http://')
+
+def warm_zoom():
+    """The pre-warmed zoom process if it is still running, otherwise None."""
+    zoom = PROCESSES.get('zoom')
+    if zoom is not None and zoom.group_alive():
+        return zoom
+    return None
+
+def prewarm_zoom():
+    """Start zoom ahead of the next meeting and wait until its main window is ready."""
+    if warm_zoom() is not None:
+        return True
+    logging.info("Pre-warming zoom..")
+    start = time.time()
+    # output is not read while zoom waits for the meeting
+    zoom = PROCESSES.spawn('zoom', "zoom", stdout=subprocess.DEVNULL)
+    name, box = SCREEN_MATCHER.wait_for(['join_meeting.png'], timeout=ZOOM_READY_TIMEOUT)
+    if name is None or not zoom.group_alive():
+        logging.error(f"Pre-warmed zoom not ready after {time.time() - start:.0f}s")
+        PROCESSES.stop('zoom')
+        return False
+    logging.info(f"Zoom pre-warmed in {time.time() - start:.1f}s")
+    return True
 
 def join_meeting_id(meet_id):
     logging.info("Join a meeting by ID..")
     found_join_meeting = False
     try:
-        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'join_meeting.png'), minSearchTime=2, confidence=0.9)
+        x, y = SCREEN_MATCHER.locate_center('join_meeting.png', min_search_time=2)
         pyautogui.click(x, y)
         found_join_meeting = True
     except TypeError:
@@ -327,25 +326,16 @@ def join_meeting_id(meet_id):
     time.sleep(2)
 
     # Insert meeting id
-    pyautogui.press('tab')
-    pyautogui.press('tab')
-    pyautogui.write(meet_id, interval=0.1)
+    TEXT_INPUT.press('tab', 'tab')
+    TEXT_INPUT.write(meet_id)
 
     # Insert name
-    pyautogui.press('tab')
-    pyautogui.press('tab')
-    pyautogui.hotkey('ctrl', 'a')
-    pyautogui.write(DISPLAY_NAME, interval=0.1)
+    TEXT_INPUT.press('tab', 'tab')
+    TEXT_INPUT.clear_field()
+    TEXT_INPUT.write(DISPLAY_NAME)
 
     # Configure
-    pyautogui.press('tab')
-    pyautogui.press('space')
-    pyautogui.press('tab')
-    pyautogui.press('tab')
-    pyautogui.press('space')
-    pyautogui.press('tab')
-    pyautogui.press('tab')
-    pyautogui.press('space')
+    TEXT_INPUT.press('tab', 'space', 'tab', 'tab', 'space', 'tab', 'tab', 'space')
 
     time.sleep(2)
 
@@ -356,16 +346,11 @@ def join_meeting_url():
     logging.info("Join a meeting by URL..")
 
     # Insert name
-    pyautogui.hotkey('ctrl', 'a')
-    pyautogui.write(DISPLAY_NAME, interval=0.1)
+    TEXT_INPUT.clear_field()
+    TEXT_INPUT.write(DISPLAY_NAME)
 
     # Configure
-    pyautogui.press('tab')
-    pyautogui.press('space')
-    pyautogui.press('tab')
-    pyautogui.press('space')
-    pyautogui.press('tab')
-    pyautogui.press('space')
+    TEXT_INPUT.press('tab', 'space', 'tab', 'space', 'tab', 'space')
 
     time.sleep(2)
 
@@ -374,13 +359,11 @@ def join_meeting_url():
 
 def check_error():
     # Sometimes invalid id error is displayed
-    if wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'invalid_meeting_id.png'), confidence=0.9) is not None:
+    if SCREEN_MATCHER.locate_center('invalid_meeting_id.png') is not None:
         logging.error("Maybe a invalid meeting id was inserted..")
         left = False
         try:
-            x, y = wrap( pyautogui.locateCenterOnScreen, 
-                os.path.join(IMG_PATH, 'leave.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('leave.png')
             pyautogui.click(x, y)
             left = True
         except TypeError:
@@ -388,35 +371,19 @@ def check_error():
             # Valid id
 
         if left:
-            if wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                    IMG_PATH, 'join_meeting.png'), confidence=0.9) is not None:
+            if SCREEN_MATCHER.locate_center('join_meeting.png') is not None:
                 logging.error("Invalid meeting id!")
                 return False
         else:
             return True
 
-    if wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'authorized_attendees_only.png'), confidence=0.9) is not None:
+    if SCREEN_MATCHER.locate_center('authorized_attendees_only.png') is not None:
         logging.error("This meeting is for authorized attendees only!")
         return False
 
     return True
 
 
-def find_process_id_by_name(process_name):
-    list_of_process_objects = []
-    # Iterate over the all the running process
-    for proc in psutil.process_iter():
-        try:
-            pinfo = proc.as_dict(attrs=['pid', 'name'])
-            # Check if process name contains the given name string.
-            if process_name.lower() in pinfo['name'].lower():
-                list_of_process_objects.append(pinfo)
-        except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-            pass
-    return list_of_process_objects
-
-
 def show_toolbars():
     # Mouse move to show toolbar
     width, height = pyautogui.size()
@@ -428,8 +395,7 @@ def show_toolbars():
 def join_audio(description):
     audio_joined = False
     try:
-        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'join_with_computer_audio.png'), confidence=0.9)
+        x, y = SCREEN_MATCHER.locate_center('join_with_computer_audio.png')
         logging.info("Join with computer audio..")
         pyautogui.click(x, y)
         audio_joined = True
@@ -443,8 +409,7 @@ def join_audio(description):
     if not audio_joined:
         try:
             show_toolbars()
-            x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'join_audio.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('join_audio.png')
             pyautogui.click(x, y)
             join_audio(description)
         except TypeError:
@@ -459,8 +424,7 @@ def join_audio(description):
 def unmute(description):
     try:
         show_toolbars()
-        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'unmute.png'), confidence=0.9)
+        x, y = SCREEN_MATCHER.locate_center('unmute.png')
         pyautogui.click(x, y)
         return True
     except TypeError:
@@ -473,8 +437,7 @@ def unmute(description):
 def mute(description):
     try:
         show_toolbars()
-        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'mute.png'), confidence=0.9)
+        x, y = SCREEN_MATCHER.locate_center('mute.png')
         pyautogui.click(x, y)
         return True
     except TypeError:
@@ -483,31 +446,150 @@ def mute(description):
             pyautogui.screenshot(os.path.join(DEBUG_PATH, time.strftime(TIME_FORMAT) + "-" + description) + "_mute_error.png")
         return False
 
-def start_recording(filename):
+# encoder profile selected by benchmark at startup (RECORDING_PROFILE=auto)
+PROFILE_SELECTOR = None
+
+# progress readers of the running ffmpeg processes by name
+RECORDING_PROGRESS = {}
+
+def init_encoder_profile():
+    global PROFILE_SELECTOR
+    if RECORDING_PROFILE == 'auto':
+        width, height = pyautogui.size()
+        PROFILE_SELECTOR = ProfileSelector(str(width) + 'x' + str(height))
+        PROFILE_SELECTOR.select()
+    elif RECORDING_PROFILE and find_profile(RECORDING_PROFILE) is None:
+        logging.error(f"Unknown encoder profile '{RECORDING_PROFILE}', using FFMPEG_INPUT_PARAMS/FFMPEG_OUTPUT_PARAMS")
+
+def current_profile():
+    """Selected encoder profile, None if FFMPEG_*_PARAMS are used."""
+    return PROFILE_SELECTOR.current() if PROFILE_SELECTOR else find_profile(RECORDING_PROFILE)
+
+def recording_params(profile=None):
+    """Input params, output params and framerate of the encoder profile or FFMPEG_*_PARAMS."""
+    profile = profile or current_profile()
+    if profile:
+        return profile.input_params, profile.output_params, profile.framerate
+    return FFMPEG_INPUT_PARAMS, FFMPEG_OUTPUT_PARAMS, 30
+
+# posts to the event log, in order and without blocking the supervisor checks
+EVENT_LOG = ThreadPoolExecutor(max_workers=1, thread_name_prefix='event-log')
+
+def post_event_log(event, content):
+    def post(event_key, content):
+        try:
+            post_event_log_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event_key, content, timeout=EVENT_LOG_TIMEOUT)
+        except Exception as e:
+            logging.error(f"Error posting event log: {e}")
+    EVENT_LOG.submit(post, event[EventField.KEY.value], f"{datetime.now().isoformat()} {CLIENT_ID}: {content}\n")
+
+def recording_health_check(health, event):
+    """Supervisor check logging the recording health, alerts are also posted to the event log."""
+    def check(tick):
+        status, alert = health.check()
+        logging.info(status)
+        if alert:
+            logging.error(f"Recording alert: {alert}")
+            post_event_log(event, f"Recording alert: {alert} ({status})")
+    return Check('recording_health', check, RECORDING_HEALTH_SEC, priority=5)
+
+def profile_bitrate(profile):
+    """Bytes per second of a recording with profile, measured by previous recordings if available."""
+    if profile is None:
+        return STORAGE.bitrate('custom', STORAGE_DEFAULT_MBIT * 125000)
+    return STORAGE.bitrate(profile.name, profile.mbit * 125000)
+
+def select_recording_storage(seconds, event):
+    """
+    Make sure a recording of seconds fits into REC_PATH. Recordings are evicted by
+    retention policy, if still too short the recording falls back to cheaper encoder
+    profiles, at last (STORAGE_EVICT_OLDEST) the oldest recordings are evicted.
+    Returns (profile, fits). fits is only False if the estimate is based on measured
+    bitrates (or STORAGE_STRICT), otherwise the cheapest profile records anyway.
+    """
+    profile = current_profile()
+    candidates = [profile]
+    if PROFILE_SELECTOR:
+        candidates += PROFILE_SELECTOR.usable[PROFILE_SELECTOR.index + 1:]
+
+    STORAGE.expire()
+    for evict in (False, True):
+        for candidate in candidates:
+            needed = STORAGE.estimate(seconds, profile_bitrate(candidate))
+            if STORAGE.ensure(needed) if evict else STORAGE.fits(needed):
+                if candidate is not profile:
+                    logging.warning(f"Not enough disk space for profile {profile}, recording with {candidate}")
+                return candidate, True
+    alert = f"Not enough disk space for a recording of {seconds / 60:.0f} minutes " \
+            f"({STORAGE.free_bytes() / 1073741824:.1f} GB free)"
+    cheapest = candidates[-1]
+    if STORAGE_STRICT or STORAGE.measured(cheapest.name if cheapest else 'custom'):
+        logging.error(alert)
+        return profile, False
+    # the bitrate is a guess (e.g. lossless default), never drop the recording because of it
+    logging.warning(f"{alert}, estimated bitrate not measured yet, recording with {cheapest}")
+    post_event_log(event, f"Warning: {alert}, recording with {cheapest} anyway")
+    return cheapest, True
+
+def storage_check(event):
+    """Supervisor check keeping the reserved free space while recording."""
+    low = [False] # posted once while space is low
+    def check(tick):
+        if STORAGE.ensure(0):
+            low[0] = False
+            return
+        alert = f"Disk space low: {STORAGE.free_bytes() / 1073741824:.1f} GB free in {REC_PATH}"
+        logging.error(alert)
+        if not low[0]:
+            low[0] = True
+            post_event_log(event, alert)
+    return Check('storage', check, RECORDING_HEALTH_SEC, priority=5)
+
+def start_recording(filename, name='ffmpeg', segment_minutes=0, audio_format='', profile=None):
 
     # Start recording
     width, height = pyautogui.size()
     resolution = str(width) + 'x' + str(height)
     disp = os.getenv('DISPLAY')
+    input_params, output_params, framerate = recording_params(profile)
+    if RECORDING_MAX_FPS > 0:
+        framerate = RECORDING_MAX_FPS
+    vsync = "-vsync 1"
+    if RECORDING_VFR:
+        # vsync is part of the VFR output params
+        output_params = vfr_output_params(output_params, framerate, RECORDING_KEYFRAME_SEC)
+        vsync = ""
 
     logging.debug("Start recording joining process..")
 
-    command = "ffmpeg -nostats -loglevel error -f pulse -ac 2 -i 1 -f x11grab -r 30 -s " + \
-        resolution + " " + FFMPEG_INPUT_PARAMS + " -i " + disp + " " + FFMPEG_OUTPUT_PARAMS + \
-        " -threads 0 -async 1 -vsync 1 \"" + filename + "\""
+    if segment_minutes > 0:
+        # segments survive a crash of ffmpeg/container, finalize_segments() joins them afterwards
+        output = segment_output(filename, segment_minutes)
+    else:
+        output = "\"" + filename + "\""
+
+    if audio_format in AUDIO_OUTPUT_PARAMS:
+        # postprocessing uses this file instead of extracting the audio from the recording
+        audio_filename = os.path.splitext(filename)[0] + "." + audio_format
+        output += " -map 0:a -vn -ac 1 -ar 16000 " + AUDIO_OUTPUT_PARAMS[audio_format] + " \"" + audio_filename + "\""
+    elif audio_format:
+        logging.error(f"Unknown audio format '{audio_format}', no separate audio recorded")
+
+    command = "ffmpeg -nostats -loglevel error " + PROGRESS_PARAMS + " -f pulse -ac 2 -i 1 -f x11grab -r " + str(framerate) + " -s " + \
+        resolution + " " + input_params + " -i " + disp + " " + output_params + \
+        " -threads 0 -async 1 " + vsync + " " + output
 
     logging.debug(f"Recording command: {command}")
 
-    subprocess_info = subprocess.Popen(
-        command, stdout=subprocess.PIPE, shell=True, preexec_fn=os.setsid)
-    
-    atexit.register(os.killpg, os.getpgid(
-        subprocess_info.pid), signal.SIGQUIT)
-    
-    return subprocess_info
+    process = PROCESSES.spawn(name, command, stdout=subprocess.PIPE)
+    # stdout has to be read, a full pipe would block ffmpeg
+    # a slow debug recording must not switch the profile of the main recording
+    on_progress = SlowEncodingDetector(PROFILE_SELECTOR.fallback) if PROFILE_SELECTOR and name == 'ffmpeg' else None
+    RECORDING_PROGRESS[name] = FfmpegProgress(process.popen.stdout, on_progress).start()
+    return process
     
 def join(event):
-    global VIDEO_PANEL_HIDED
+    global VIDEO_PANEL_HIDED, ACTIVE_RECORDING
     
     if int(event[EventField.STATUS.value]) == int(EventStatus.SCHEDULED.value):
         if not event[EventField.ASSIGNED.value]:
@@ -532,52 +614,57 @@ def join(event):
     description = event[EventField.TITLE.value]
 
     logging.info("Join meeting: " + description)
+    trace = JoinTrace(JOIN_TRACE_FILE, event.get(EventField.KEY.value), description)
 
     ffmpeg_debug = None
     if logging.getLogger().level == logging.DEBUG:
         ffmpeg_debug = start_recording( filename = os.path.join( 
-            REC_PATH, convert_to_safe_filename( time.strftime(TIME_FORMAT)) + "-" + description + "-JOIN.mkv"))
+            REC_PATH, convert_to_safe_filename( time.strftime(TIME_FORMAT)) + "-" + description + "-JOIN.mkv"),
+            name='ffmpeg_debug')
 
-    # Exit Zoom if running
-    exit_process_by_name("zoom")
+    join_by_url = is_join_by_url(event)
 
-    join_by_url = meet_url.startswith('https://') or meet_url.startswith('http://')
+    trace.step('start_zoom')
+    zoom = warm_zoom()
+    if zoom is not None and join_by_url:
+        # the url is passed on the command line, zoom has to be started with it
+        PROCESSES.stop('zoom')
+        zoom = None
 
     if not join_by_url:
-        # Start Zoom
-        zoom = subprocess.Popen("zoom", stdout=subprocess.PIPE,
-                                shell=True, preexec_fn=os.setsid)
+        if zoom is not None:
+            logging.info("Using pre-warmed zoom")
+        else:
+            # Start Zoom
+            zoom = PROCESSES.spawn('zoom', "zoom", stdout=subprocess.PIPE)
         img_name = 'join_meeting.png'
     else:
         logging.info("Starting zoom with url")
-        zoom = subprocess.Popen(f'zoom --url="{meet_url}"', stdout=subprocess.PIPE,
-                                shell=True, preexec_fn=os.setsid)
+        zoom = PROCESSES.spawn('zoom', f'zoom --url="{meet_url}"', stdout=subprocess.PIPE)
         img_name = 'join.png'
     
-    # Wait while zoom process is there
-    list_of_process_ids = find_process_id_by_name('zoom')
-    while len(list_of_process_ids) <= 0:
-        logging.info("No Running Zoom Process found!")
-        list_of_process_ids = find_process_id_by_name('zoom')
-        time.sleep(1)
-
     # Wait for zoom is started
-    loop = True
+    trace.step('wait_ready')
     useCase = UC_CONNECTED_POPUPS # standard use case
-    while (True):
-        if wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, img_name), confidence=0.9):
-           break
-        else:
-           if wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'leave_red.png'), confidence=0.9):
-               useCase = UC_CONNECTED_NOPOPUPS
-               break
-
+    name, box = SCREEN_MATCHER.wait_for([img_name, 'leave_red.png'], timeout=10)
+    while name is None:
+        if not zoom.group_alive():
+            logging.error(f"Zoom exited with code {zoom.popen.poll()}!")
+            trace.fail('zoom exited')
+            trace.finish('failed')
+            PROCESSES.stop('zoom')
+            PROCESSES.stop('ffmpeg_debug')
+            return
         logging.info("Zoom not ready yet!")
-        time.sleep(1)
+        trace.retry()
+        name, box = SCREEN_MATCHER.wait_for([img_name, 'leave_red.png'], timeout=10)
+    if name == 'leave_red.png':
+        useCase = UC_CONNECTED_NOPOPUPS
 
     logging.info("Zoom started!")
     start_date = datetime.now()
 
+    trace.step('join_meeting')
     if not join_by_url:
         joined = join_meeting_id(meet_id)
     else:
@@ -589,108 +676,79 @@ def join(event):
 
     if not joined:
         logging.error("Failed to join meeting!")
-        os.killpg(os.getpgid(zoom.pid), signal.SIGQUIT)
+        trace.fail('not joined')
+        trace.finish('failed')
+        PROCESSES.stop('zoom')
         if logging.getLogger().level == logging.DEBUG and ffmpeg_debug is not None:
             # closing ffmpeg
-            os.killpg(os.getpgid(ffmpeg_debug.pid), signal.SIGQUIT)
-            atexit.unregister(os.killpg)
+            PROCESSES.stop('ffmpeg_debug')
         return
 
     # Check if connecting
-    check_connecting(zoom.pid, start_date, duration)
+    trace.step('connecting')
+    check_connecting(start_date, duration)
 
     if not join_by_url:
-        pyautogui.write(meet_pw, interval=0.2)
-        pyautogui.press('tab')
-        pyautogui.press('space')
+        trace.step('password')
+        TEXT_INPUT.write(meet_pw, secret=True)
+        TEXT_INPUT.press('tab', 'space')
 
     # Joined meeting
     # Check if connecting
-    check_connecting(zoom.pid, start_date, duration)
-
-    # Check if meeting is started by host
-    check_periods = 0
-    meeting_started = True
-
-    time.sleep(2)
+    check_connecting(start_date, duration)
 
     # Check if waiting for host
-    if wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'wait_for_host.png'), confidence=0.9, minSearchTime=3) is not None:
-        meeting_started = False
+    trace.step('wait_for_host')
+    name, box = SCREEN_MATCHER.wait_for(['wait_for_host.png'], timeout=5)
+    if name is not None:
         logging.info("Please wait for the host to start this meeting.")
 
-    # Wait for the host to start this meeting
-    # Exit when meeting ends after time
-    while not meeting_started:
-        if (datetime.now() - start_date).total_seconds() > duration:
+        # Wait for the host to start this meeting (reacts on screen changes)
+        # Exit when meeting ends after time
+        if not SCREEN_MATCHER.wait_until_gone('wait_for_host.png', timeout=remaining_seconds(start_date, duration)):
             logging.info("Meeting ended after time!")
             logging.info("Exit Zoom!")
-            os.killpg(os.getpgid(zoom.pid), signal.SIGQUIT)
+            trace.finish('ended')
+            PROCESSES.stop('zoom')
             if logging.getLogger().level == logging.DEBUG:
-                os.killpg(os.getpgid(ffmpeg_debug.pid), signal.SIGQUIT)
-                atexit.unregister(os.killpg)
+                PROCESSES.stop('ffmpeg_debug')
             return
-
-        if wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'wait_for_host.png'), confidence=0.9) is None:
-            logging.info("Maybe meeting was started now.")
-            check_periods += 1
-            if check_periods >= 2:
-                meeting_started = True
-                logging.info("Meeting started by host.")
-                break
-        time.sleep(2)
+        logging.info("Meeting started by host.")
 
     # Check if connecting
-    check_connecting(zoom.pid, start_date, duration)
-
-    # Check if in waiting room
-    check_periods = 0
-    in_waitingroom = False
-
-    time.sleep(2)
+    check_connecting(start_date, duration)
 
     # Check if joined into waiting room
-    if wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'waiting_room.png'), confidence=0.9,
-                                      minSearchTime=3) is not None:
-        in_waitingroom = True
+    trace.step('waiting_room')
+    name, box = SCREEN_MATCHER.wait_for(['waiting_room.png'], timeout=5)
+    if name is not None:
         logging.info("Please wait, the meeting host will let you in soon..")
 
-    # Wait while host will let you in
-    # Exit when meeting ends after time
-    while in_waitingroom:
-        if (datetime.now() - start_date).total_seconds() > duration:
+        # Wait while host will let you in (reacts on screen changes)
+        # Exit when meeting ends after time
+        if not SCREEN_MATCHER.wait_until_gone('waiting_room.png', timeout=remaining_seconds(start_date, duration)):
             logging.info("Meeting ended after time!")
             logging.info("Exit Zoom!")
-            os.killpg(os.getpgid(zoom.pid), signal.SIGQUIT)
+            trace.finish('ended')
+            PROCESSES.stop('zoom')
             if logging.getLogger().level == logging.DEBUG:
-                os.killpg(os.getpgid(ffmpeg_debug.pid), signal.SIGQUIT)
-                atexit.unregister(os.killpg)
+                PROCESSES.stop('ffmpeg_debug')
             return
-
-        if wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'waiting_room.png'), confidence=0.9) is None:
-            logging.info("Maybe no longer in the waiting room..")
-            check_periods += 1
-            if check_periods == 2:
-                logging.info("No longer in the waiting room..")
-                break
-        time.sleep(2)
+        logging.info("No longer in the waiting room..")
 
     # Meeting joined
     # Check if connecting
-    check_connecting(zoom.pid, start_date, duration)
+    check_connecting(start_date, duration)
 
     logging.info("Joined meeting..")
+    trace.milestone('joined')
+    trace.step('popups')
 
     # Check if recording warning is shown at the beginning
-    if (wrap( pyautogui.locateCenterOnScreen, os.path.join(IMG_PATH, 'meeting_is_being_recorded.png'), confidence=0.9,
-                                       minSearchTime=2) is not None):
+    if (SCREEN_MATCHER.locate_center('meeting_is_being_recorded.png', min_search_time=2) is not None):
         logging.info("This meeting is being recorded..")
         try:
-            x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'got_it.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('got_it.png')
             pyautogui.click(x, y)
             logging.info("Accepted recording..")
         except TypeError:
@@ -698,13 +756,11 @@ def join(event):
 
     # Check if host is sharing poll results at the beginning
     try:
-        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'host_is_sharing_poll_results.png'), confidence=0.9)
+        x, y = SCREEN_MATCHER.locate_center('host_is_sharing_poll_results.png')
         logging.info("Host is sharing poll results..")
         pyautogui.click(x, y)
         try:
-            x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'exit.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('exit.png')
             pyautogui.click(x, y)
             logging.info("Closed poll results window..")
         except TypeError:
@@ -718,26 +774,29 @@ def join(event):
             pyautogui.screenshot(os.path.join(DEBUG_PATH, time.strftime(
                 TIME_FORMAT) + "-" + description) + "_find_poll_results_error.png")
 
-    # Start BackgroundThread
-    BackgroundThread()
+    # Start supervisor with background checks
+    supervisor = start_supervisor(zoom)
 
     # Set computer audio
-    time.sleep(2)
+    trace.step('join_audio')
+    trace.sleep(2)
     if not join_audio(description):
+        trace.fail('no computer audio')
         if not useCase == UC_CONNECTED_NOPOPUPS: 
             logging.info("Exit!")
-            os.killpg(os.getpgid(zoom.pid), signal.SIGQUIT)
+            PROCESSES.stop('zoom')
             if logging.getLogger().level == logging.DEBUG:
-                os.killpg(os.getpgid(ffmpeg_debug.pid), signal.SIGQUIT)
-                atexit.unregister(os.killpg)
+                PROCESSES.stop('ffmpeg_debug')
             time.sleep(2)
             # join(event)
 
     # 'Say' something if path available (mounted)
     if os.path.exists(AUDIO_PATH):
+        trace.step('play_audio')
         play_audio(description)
 
-    time.sleep(2)
+    trace.step('view')
+    trace.sleep(2)
     logging.info("DoubleClick for Fullscreen..")
     pyautogui.doubleClick(x=10, y=200, interval=0.1)
     # time.sleep(2)
@@ -804,8 +863,7 @@ def join(event):
     # Screensharing not active
     screensharing_active = False
     try:
-        x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-            IMG_PATH, 'view_options.png'), confidence=0.9)
+        x, y = SCREEN_MATCHER.locate_center('view_options.png')
         pyautogui.click(x, y)
         screensharing_active = True
     except TypeError:
@@ -814,13 +872,12 @@ def join(event):
             pyautogui.screenshot(os.path.join(DEBUG_PATH, time.strftime(
                 TIME_FORMAT) + "-" + description) + "_view_options_error.png")
 
-    time.sleep(2)
+    trace.sleep(2)
 
     if screensharing_active:
         # hide video panel
         try:
-            x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'hide_video_panel.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('hide_video_panel.png')
             pyautogui.click(x, y)
             VIDEO_PANEL_HIDED = True
             logging.info("Video panel hidden successfully..")
@@ -835,8 +892,7 @@ def join(event):
 
         logging.info("Switch view..")
         try:
-            x, y = wrap( pyautogui.locateCenterOnScreen, 
-                os.path.join(IMG_PATH, 'view.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('view.png')
             pyautogui.click(x, y)
         except TypeError:
             logging.error("Could not find view!")
@@ -844,12 +900,11 @@ def join(event):
                 pyautogui.screenshot(os.path.join(DEBUG_PATH, time.strftime(
                     TIME_FORMAT) + "-" + description) + "_view_error.png")
 
-        time.sleep(2)
+        trace.sleep(2)
 
         try:
             # speaker view
-            x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'speaker_view.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('speaker_view.png')
             pyautogui.click(x, y)
         except TypeError:
             logging.error("Could not switch speaker view!")
@@ -859,8 +914,7 @@ def join(event):
 
         try:
             # minimize panel
-            x, y = wrap( pyautogui.locateCenterOnScreen, os.path.join(
-                IMG_PATH, 'minimize.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('minimize.png')
             pyautogui.click(x, y)
         except TypeError:
             logging.error("Could not minimize panel!")
@@ -873,13 +927,34 @@ def join(event):
     pyautogui.click(0, 100)
 
     if logging.getLogger().level == logging.DEBUG and ffmpeg_debug is not None:
-        os.killpg(os.getpgid(ffmpeg_debug.pid), signal.SIGQUIT)
-        atexit.unregister(os.killpg)
+        PROCESSES.stop('ffmpeg_debug')
 
     process = Events.get_instruction_attribute( EventInstructionAttribute.PROCESS, event)
     filename_recording = os.path.join(REC_PATH, convert_to_safe_filename(time.strftime( TIME_FORMAT) + "-" + description) + ".mkv")
+    postprocess = Events.get_instruction_attribute( EventInstructionAttribute.POSTPROCESS, event)  
+    transcriber = None
+    trace.step('start_recording')
+    if process == 'record':
+        profile, fits = select_recording_storage(duration + TRAIL_TIME_SEC, event)
+        if not fits:
+            post_event_log(event, f"Not recorded: not enough disk space ({STORAGE.free_bytes() / 1073741824:.1f} GB free)")
+            process = None
+            postprocess = None
     if process == 'record':
-        ffmpeg = start_recording(filename_recording)
+        ACTIVE_RECORDING = filename_recording
+        recording_start = time.time()
+        ffmpeg = start_recording(filename_recording, segment_minutes=RECORDING_SEGMENT_MIN, audio_format=RECORDING_AUDIO,
+            profile=profile)
+        supervisor.add(storage_check(event), delay=RECORDING_HEALTH_SEC)
+        recording_health = RecordingHealth(ffmpeg, RECORDING_PROGRESS['ffmpeg'])
+        supervisor.add(recording_health_check(recording_health, event), delay=RECORDING_HEALTH_SEC)
+        if postprocess == 'transcribe' and RECORDING_SEGMENT_MIN > 0:
+            # transcribe completed segments while recording instead of postprocessing
+            transcriber = StreamingTranscriber(filename_recording,
+                create_backend(TRANSCRIBE_BACKEND, TRANSCRIBE_API_URL)).start()
+        trace.milestone('recording_started')
+    trace.finish('recording' if process == 'record' else 'joined')
+    logging.info(f"Join step timings:\n{JoinTrace.report(JOIN_TRACE_FILE)}")
 
     # update event
     try:
@@ -892,8 +967,8 @@ def join(event):
     start_date = datetime.now()
     end_date = start_date + timedelta(seconds=duration + TRAIL_TIME_SEC)  # Add 5 minutes
 
-    # Start thread to check active screensharing
-    HideViewOptionsThread(description)
+    # Add checks for active screensharing, polls and chats
+    add_hide_view_options_checks(supervisor)
         
     meeting_running = True
     while meeting_running:
@@ -902,71 +977,150 @@ def join(event):
             meeting_running = False
         else:
             print(f"Meeting ends in {time_remaining}", end="\r", flush=True)
-        time.sleep(5)
+        # returns as soon as the supervisor detected the end of the meeting
+        supervisor.stopped.wait(5)
 
     logging.info("Meeting ends at %s" % datetime.now())
+    supervisor.stop()
+    logging.info(f"Supervisor checks:\n{supervisor.report()}")
+    for flow in SCREEN_FLOWS.values():
+        if flow.timings:
+            logging.info(f"Screen flow timings:\n{flow.timing_report()}")
 
     # Close everything
     if logging.getLogger().level == logging.DEBUG and ffmpeg_debug is not None:
-        os.killpg(os.getpgid(ffmpeg_debug.pid), signal.SIGQUIT)
-        atexit.unregister(os.killpg)
+        PROCESSES.stop('ffmpeg_debug')
 
-    os.killpg(os.getpgid(zoom.pid), signal.SIGQUIT)
-    os.killpg(os.getpgid(ffmpeg.pid), signal.SIGQUIT)
-    atexit.unregister(os.killpg)
+    PROCESSES.stop('zoom')
+    if process == 'record':
+        post_event_log(event, f"Recording finished: {recording_health.status()}")
+    # an encoder behind real-time needs time to flush its backlog and write the trailer, killing truncates the recording
+    PROCESSES.stop('ffmpeg', timeout=RECORDING_STOP_TIMEOUT or None)
+    if transcriber is not None:
+        transcriber.stop()
+        if transcriber.failed:
+            logging.error(f"Streaming transcription incomplete, transcribing '{filename_recording}' completely")
+        else:
+            # the rest is transcribed by the postprocessing workers
+            STREAMING_TRANSCRIBERS[filename_recording] = transcriber
+            postprocess = 'transcribe_finish'
+    if process == 'record' and RECORDING_SEGMENT_MIN > 0:
+        finalize_segments(filename_recording)
+    if process == 'record':
+        ACTIVE_RECORDING = None
+        if os.path.exists(filename_recording):
+            STORAGE.record_bitrate(profile.name if profile else 'custom',
+                os.path.getsize(filename_recording), time.time() - recording_start)
 
     if not ONGOING_MEETING:
         try:
             # Press OK after meeting ended by host
-            x, y = wrap( pyautogui.locateCenterOnScreen, 
-                os.path.join(IMG_PATH, 'ok.png'), confidence=0.9)
+            x, y = SCREEN_MATCHER.locate_center('ok.png')
             pyautogui.click(x, y)
         except TypeError:
             if logging.getLogger().level == logging.DEBUG:
                 pyautogui.screenshot(os.path.join(DEBUG_PATH, time.strftime(
                     TIME_FORMAT) + "-" + description) + "_ok_error.png")
                 
-    postprocess = Events.get_instruction_attribute( EventInstructionAttribute.POSTPROCESS, event)  
+    # released before postprocessing is queued, its job moves the event on to POSTPROCESS
+    try:
+        event[EventField.STATUS.value] = EventStatus.SCHEDULED.value
+        event[EventField.ASSIGNED.value] = ''
+        event[EventField.ASSIGNED_TIMESTAMP.value] = ''
+        update_event_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event)
+    except Exception as e:
+        logging.error(f"Error updating event: {e}")
 
     if postprocess:
-        command = f"./postprocess.sh {postprocess} '{filename_recording}'"
-        logging.debug(f"Postprocess command: {command}")
+        # run by the postprocessing workers, so the next meeting can be joined meanwhile
+        POSTPROCESS_QUEUE.enqueue(postprocess, filename_recording, Events.clean(event))
 
-        postprocess_process = subprocess.Popen(
-            command, stdout=subprocess.PIPE, shell=True, preexec_fn=os.setsid)
-        
-        atexit.register(os.killpg, os.getpgid(
-            postprocess_process.pid), signal.SIGQUIT)
-        
-        if postprocess_process:
-            posprocessing_start = datetime.now()
-            txt = f"Started postprocessing task '{postprocess}'..."
-            logging.info(txt)
-            print(txt, end="\r", flush=True)
+# streaming transcribers of finished recordings, finished by the 'transcribe_finish' job
+STREAMING_TRANSCRIBERS = {}
+
+def run_postprocess(job):
+    if job['command'] == 'transcribe_finish':
+        # finish the transcript of the streaming transcriber, the full transcription if it is
+        # incomplete or gone (restart)
+        transcriber = STREAMING_TRANSCRIBERS.pop(job['filename'], None)
+        try:
+            if transcriber is not None and transcriber.finish():
+                return 0
+        except Exception as e:
+            logging.error(f"Finishing transcript of '{job['filename']}' failed: {e}")
+        logging.info(f"Transcribing '{job['filename']}' completely")
+        job = dict(job, command='transcribe')
+    command = f"./postprocess.sh {job['command']} '{job['filename']}'"
+    logging.debug(f"Postprocess command: {command}")
+    return PROCESSES.spawn(f"postprocess-{job['id']}", command, stdout=subprocess.DEVNULL).wait()
+
+def postprocess_started(job):
+    txt = f"Started postprocessing task '{job['command']}' of '{job['filename']}'..."
+    logging.info(txt)
+    if not job['event']:
+        return
+    # the job's event is a snapshot from enqueuing, only change the state of the current event
+    # unless it was deleted or taken over meanwhile
+    try:
+        events = get_event_api( SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD,
+            filters=[[EventField.KEY.value, "=", job['event'][EventField.KEY.value]]])
+        if events and int(events[0][EventField.STATUS.value]) == EventStatus.SCHEDULED.value \
+                and events[0][EventField.ASSIGNED.value] in ('', CLIENT_ID):
+            event = events[0]
             event[EventField.STATUS.value] = EventStatus.POSTPROCESS.value
             event[EventField.ASSIGNED.value] = CLIENT_ID
             event[EventField.ASSIGNED_TIMESTAMP.value] = Events.now(event).isoformat()
-            try:
-                update_event_api( SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event)
-            except Exception as e:
-                logging.error(f"Error updating event: {e}")
-
-            postprocess_process.wait()
-            posprocessing_end = datetime.now()
-            postprocessing_duration = posprocessing_end - posprocessing_start
-            logging.info(f"Postprocessing task completed in {postprocessing_duration}")
-
-        else:
-            logging.error("Postprocessing script not found or not specified.")
+            update_event_api( SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event)
+    except Exception as e:
+        logging.error(f"Error updating event: {e}")
 
+def postprocess_done(job, returncode, duration):
+    PROCESSES.stop(f"postprocess-{job['id']}")
+    if returncode == 0:
+        logging.info(f"Postprocessing task '{job['command']}' completed in {timedelta(seconds=int(duration))}")
+    else:
+        logging.error(f"Postprocessing task '{job['command']}' of '{job['filename']}' failed with code {returncode}")
+    if not job['event']:
+        return
+    # release the event unless it was taken over meanwhile (e.g. joined again)
     try:
-        event[EventField.STATUS.value] = EventStatus.SCHEDULED.value
-        event[EventField.ASSIGNED.value] = ''
-        event[EventField.ASSIGNED_TIMESTAMP.value] = ''
-        update_event_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event)
+        events = get_event_api( SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD,
+            filters=[[EventField.KEY.value, "=", job['event'][EventField.KEY.value]]])
+        if events and int(events[0][EventField.STATUS.value]) == EventStatus.POSTPROCESS.value \
+                and events[0][EventField.ASSIGNED.value] == CLIENT_ID:
+            event = events[0]
+            event[EventField.STATUS.value] = EventStatus.SCHEDULED.value
+            event[EventField.ASSIGNED.value] = ''
+            event[EventField.ASSIGNED_TIMESTAMP.value] = ''
+            update_event_api(SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event)
     except Exception as e:
         logging.error(f"Error updating event: {e}")
 
+def pause_idle_postprocessing(pause):
+    """Stop (SIGSTOP) or continue (SIGCONT) running idle-only postprocessing jobs."""
+    for job in POSTPROCESS_QUEUE.running_jobs():
+        if job['command'] in POSTPROCESS_IDLE_ONLY:
+            process = PROCESSES.get(f"postprocess-{job['id']}")
+            if process is not None:
+                logging.info(f"{'Pausing' if pause else 'Continuing'} postprocessing task '{job['command']}' of '{job['filename']}'")
+                process.signal(signal.SIGSTOP if pause else signal.SIGCONT)
+
+def recording_in_use(path):
+    """True for files of the running recording or of queued postprocessing jobs (incl. sidecar/temporary files)."""
+    files = [job['filename'] for job in POSTPROCESS_QUEUE.pending_jobs()]
+    if ACTIVE_RECORDING:
+        files.append(ACTIVE_RECORDING)
+    return any(path.startswith(os.path.splitext(file)[0]) for file in files)
+
+POSTPROCESS_QUEUE = PostprocessQueue(os.path.join(REC_PATH, "postprocess_queue"), run_postprocess,
+    workers=POSTPROCESS_WORKERS, on_start=postprocess_started, on_done=postprocess_done,
+    idle_only=POSTPROCESS_IDLE_ONLY, is_idle=lambda: PROCESSES.get('zoom') is None)
+
+# recording being written, protected from eviction
+ACTIVE_RECORDING = None
+STORAGE = StorageManager(REC_PATH, int(STORAGE_MIN_FREE_GB * 1073741824), STORAGE_RETENTION_DAYS,
+    STORAGE_EVICT_OLDEST, is_protected=recording_in_use)
+
 def play_audio(description):
     # Get all files in audio directory
     files=os.listdir(AUDIO_PATH)
@@ -991,18 +1145,6 @@ def play_audio(description):
         logging.error("No .wav files found!")
 
 
-def exit_process_by_name(name):
-    list_of_process_ids = find_process_id_by_name(name)
-    if len(list_of_process_ids) > 0:
-        logging.info(name + " process exists | killing..")
-        for elem in list_of_process_ids:
-            process_id = elem['pid']
-            try:
-                os.kill(process_id, signal.SIGKILL)
-            except Exception as ex:
-                logging.error("Could not terminate " + name +
-                              "[" + str(process_id) + "]: " + str(ex))
-
 def get_zoom_version():
     try:
         # Execute the command to get the installed version of the Zoom package, suppressing warnings
@@ -1020,40 +1162,44 @@ def get_zoom_version():
         return None
 
 def main():
+    # join segments of recordings interrupted by a crash
+    recover_segments(REC_PATH)
+    # benchmark encoders if RECORDING_PROFILE=auto
+    init_encoder_profile()
+    # continue postprocessing jobs of a previous run
+    POSTPROCESS_QUEUE.start()
 
     def monitor_events():
         """Monitor and join events based on time windows with local event storage"""
         monitor_events = {}
-        max_last_updated_timestamp = None
-        # Filter to get only planned events
-        filter_type = [EventField.TYPE.value, "=", EventType.ZOOM.value]
-        filters = [filter_type, [EventField.STATUS.value, "=", EventStatus.SCHEDULED.value]]
+        revision = 0 # change feed cursor: revision of the latest change received
+        # Filter to get only zoom events
+        filters = [[EventField.TYPE.value, "=", EventType.ZOOM.value]]
+        wait = 0 # seconds the server may hold the request until an event changes
 
         while True:
             try:
-                # Get updates from API
-                updated_events = get_event_api(
+                # Get the events changed since the last revision (the scheduled events at the start)
+                updated_events, revision_changes = get_event_changes_api(
                     SERVER_URL,
                     SERVER_USERNAME,
                     SERVER_PASSWORD,
-                    filters=filters
+                    since=revision,
+                    filters=filters if revision else filters + [[EventField.STATUS.value, "=", EventStatus.SCHEDULED.value]],
+                    wait=wait
                 )
-                
-                # Update max timestamp from current batch
                 if updated_events:
-                    max_last_updated_timestamp = max(event[EventField.LAST_UPDATED_TIMESTAMP.value] for event in updated_events)
-                    logging.info(f"events updated: {len(updated_events)} , latest update: {max_last_updated_timestamp}")
-                    # Set filter to only get events updated after the latest timestamp (also deleted so we can remove them)
-                    filters = [ filter_type, [EventField.LAST_UPDATED_TIMESTAMP.value, ">", max_last_updated_timestamp]]
-                
+                    logging.info(f"events updated: {len(updated_events)} , revision: {revision_changes}")
+                revision = revision_changes
+
                 # Merge updates using dictionary
                 for event in updated_events:
                     if event[EventField.STATUS.value] == EventStatus.DELETED.value:
                         # Remove deleted events
-                        del monitor_events[event[EventField.KEY.value]]  # Remove entry if exists
+                        monitor_events.pop(event[EventField.KEY.value], None)  # Remove entry if exists
                     elif event[EventField.ASSIGNED.value] and event[EventField.ASSIGNED.value] != CLIENT_ID:
                          # events assigned to other clients
-                        del monitor_events[event[EventField.KEY.value]]  # Remove entry if exists
+                        monitor_events.pop(event[EventField.KEY.value], None)  # Remove entry if exists
                     else:
                         # Add or update event
                         monitor_events[event[EventField.KEY.value]] = event  # Add or update entry
@@ -1082,7 +1228,11 @@ def main():
                             
                             if start_window <= now_in_tz <= end_window:
                                 logging.info(f"Joining event {event[EventField.KEY.value]} title: '{event[EventField.TITLE.value]}'")
-                                join(event)
+                                pause_idle_postprocessing(True)
+                                try:
+                                    join(event)
+                                finally:
+                                    pause_idle_postprocessing(False)
                                 break  # once we return monitoring will continue. One client can only join 1 event
                             elif start_window > now_in_tz and start_window < next_event_dtstart:
                                 next_event_dtstart = start_window
@@ -1091,23 +1241,41 @@ def main():
                         # delte expired events
                         if max_end_window < now_in_tz:  # all events are expired
                             # the event will come through nexrt update as delted and will be removed from monitoring events
-                            delete_event_api( SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event_key=event[EventField.KEY.value])
+                            delete_event_api( SERVER_URL, SERVER_USERNAME, SERVER_PASSWORD, event_key=event[EventField.KEY.value], expired=True)
                             
                     except Exception as e:
                         logging.error(f"Event processing error: {str(e)}")
+
+                # Start zoom ahead of the next meeting, stop it if the meeting was removed or moved
+                if ZOOM_PREWARM_SEC > 0:
+                    if next_event and not is_join_by_url(next_event) and \
+                            next_event_dtstart - Events.now(next_event) <= timedelta(seconds=ZOOM_PREWARM_SEC):
+                        prewarm_zoom()
+                    elif warm_zoom() is not None:
+                        logging.info("Stopping pre-warmed zoom, no meeting ahead")
+                        PROCESSES.stop('zoom')
                 
-                for _ in range(60):
-                    if next_event:
-                        now_in_tz = Events.now( next_event)
-                        print(f"Next event with title: '{next_event[EventField.TITLE.value]}' starts in {next_event_dtstart - now_in_tz}", end="\r", flush=True)
-                    else:
-                        print(f"No upcoming events (monitoring {len(monitor_events)} events)", end="\r", flush=True)
-                    
-                    time.sleep(1)
+                # Block on the change feed until an event changes or the next start window (or pre-warm) is due
+                wait = EVENT_WAIT_SEC
+                if next_event:
+                    now_in_tz = Events.now( next_event)
+                    print(f"Next event with title: '{next_event[EventField.TITLE.value]}' starts in {next_event_dtstart - now_in_tz}", end="\r", flush=True)
+                    due = (next_event_dtstart - now_in_tz).total_seconds()
+                    if ZOOM_PREWARM_SEC > 0 and warm_zoom() is None and due > ZOOM_PREWARM_SEC:
+                        due -= ZOOM_PREWARM_SEC
+                    wait = max(1, min(wait, int(due)))
+                else:
+                    print(f"No upcoming events (monitoring {len(monitor_events)} events)", end="\r", flush=True)
+                if EVENT_WAIT_SEC <= 0:
+                    # poll every minute
+                    wait = 0
+                    time.sleep(60)
                 
             except Exception as e:
                 logging.error(f"Monitoring error: {str(e)}")
                 print(f"Monitoring error: {str(e)}")
+                wait = 0
+                time.sleep(EVENT_RETRY_SEC)
 
     monitor_events()
 
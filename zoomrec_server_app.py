@@ -1,9 +1,12 @@
 import debugpy
-from flask import Flask, request, Response, jsonify, send_file # pip install flask
+from flask import Flask, request, Response, jsonify, send_file, has_request_context # pip install flask
 from flask_basicauth import BasicAuth # pip install flask-basicauth
 from datetime import datetime
 import os.path
+import threading
+import time
 import yaml
+from concurrent.futures import ThreadPoolExecutor
 from events import FIELDNAMES, Events, EventStatus, EventField, SQLLiteEvents
 from urllib.parse import unquote
 from users import SQLLiteUser, Users, UserField
@@ -27,6 +30,14 @@ ZOOMREC_DB_PATH = os.path.join(BASE_PATH, ZOOMREC_DB)
 with open('zoomrec_server_app.yaml', "r") as f:
     config = yaml.safe_load(f)
 
+LONG_POLL_MAX_SEC = 60 # longest time a change request is held
+LONG_POLL_CHECK_SEC = 0.5 # interval of checking for changes made by other workers
+EVENT_CHANGED = threading.Condition()
+
+# outbound messages (telegram) are sent by background threads
+NOTIFICATION_WORKERS = 4
+notifications = ThreadPoolExecutor(max_workers=NOTIFICATION_WORKERS, thread_name_prefix='notification')
+
 FIRMWARE_PATH = os.path.join(BASE_PATH, os.getenv('FIRMWARE_SUBDIR'))
 LOG_PATH = os.path.join(BASE_PATH, os.getenv('LOG_SUBDIR'))
 
@@ -35,30 +46,68 @@ app.config['BASIC_AUTH_USERNAME'] = os.getenv('SERVER_USERNAME')
 app.config['BASIC_AUTH_PASSWORD'] = os.getenv('SERVER_PASSWORD')
 basic_auth = BasicAuth(app)
 
+def request_filters():
+    """Filters of the request parameters Filter.<index>.Name/Operator/Value as [attribute, operator, value] lists."""
+    filters = []
+
+    # Retrieve filter parameters from the request
+    for key, value in request.args.items():
+        if key.startswith("Filter."):
+            # Extract the filter index
+            parts = key.split('.')
+            if len(parts) == 3:  # Ensure we have the correct format
+                index = parts[1]
+                if len(filters) < int(index):  # Ensure the filters list is long enough
+                    filters.append([None, None, None])  # Initialize with None
+                if parts[2] == "Name":
+                    filters[int(index) - 1][0] = value  # Set attribute
+                elif parts[2] == "Operator":
+                    filters[int(index) - 1][1] = value  # Set operator
+                elif parts[2] == "Value":
+                    filters[int(index) - 1][2] = value  # Set value
+    return filters
+
 # Define the state_changed_callback function
+# status changes users are notified about, the clients flip between the other states while recording
+NOTIFY_STATUSES = (EventStatus.PROCESS.value, EventStatus.DELETED.value)
+
 def event_state_changed_callback(old_event, new_event):
     try:
+        # the store passes the result of get(), a list with the event, and {} for a deleted event
+        old_event = old_event[0] if isinstance(old_event, list) and old_event else old_event
         message = None
-        if old_event is None:
+        if not old_event:
             event = new_event
-            message = f"Create new event with title '{new_event[EventField.TITLE.value]}' and key '{new_event[EventField.KEy.value]}'."
-        elif new_event is None:
+            message = f"Create new event with title '{new_event[EventField.TITLE.value]}' and key '{new_event[EventField.KEY.value]}'."
+        elif not new_event:
+            # clients delete expired events routinely, only deletions by the user are notified
+            if has_request_context() and request.args.get('reason') == 'expired':
+                return
             event = old_event
-            message = f"Deleted event with title '{new_event[EventField.TITLE.value]}' and key '{new_event[EventField.KEy.value]}'."
+            message = f"Deleted event with title '{old_event[EventField.TITLE.value]}' and key '{old_event[EventField.KEY.value]}'."
         else:
             event = new_event
-            if old_event[EventField.STATUS.value] != new_event[EventField.STATUS.value]:
-                new_status_description = EventStatus.get_description(new_event[EventField.STATUS.value])
-                old_status_description = EventStatus.get_description(old_event[EventField.STATUS.value])
+            old_status = int(old_event[EventField.STATUS.value])
+            new_status = int(new_event[EventField.STATUS.value])
+            if old_status != new_status and new_status in NOTIFY_STATUSES:
+                new_status_description = EventStatus.get_description(EventStatus(new_status))
+                old_status_description = EventStatus.get_description(EventStatus(old_status))
                 message = f"Event '{new_event[EventField.TITLE.value]}' status changed from {old_status_description} to {new_status_description}"
-        
-            if message:
-                user = users.get(event.get(EventField.USER_KEY.value))
-                if user:
-                    Users.send_message(user, message)
+
+        if message:
+            user = users.get(event.get(EventField.USER_KEY.value))
+            if user:
+                # sent in the background, the request does not wait for the messenger
+                notifications.submit(send_notification, user[0], message)
     except Exception as e:
         print(f"Error in event_state_changed_callback: {str(e)}")
 
+def send_notification(user, message):
+    try:
+        Users.send_message(user, message)
+    except Exception as e:
+        print(f"Error sending notification: {str(e)}")
+
 # Initialize event storage with the callback
 # events = CSVEvents(CSV_PATH, delimiter=';', stateChanged=state_changed_callback)
 events = SQLLiteEvents(ZOOMREC_DB_PATH, stateChanged=event_state_changed_callback)
@@ -165,6 +214,7 @@ def create_event():
     try:
         event = request.json
         event = events.create( event)
+        notify_event_changed()
         return jsonify(event), 200 
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -186,6 +236,7 @@ def update_event(key):
         event = request.json
         event[EventField.KEY.value] = key
         event = events.update(event)
+        notify_event_changed()
         return jsonify(event), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -196,6 +247,7 @@ def update_event(key):
 def delete_event(key):
     try:
         events.delete(key)
+        notify_event_changed()
         return jsonify({"message": f"Event with key: {key} deleted successfully"}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -206,23 +258,7 @@ def delete_event(key):
 @app.route(config['ROUTE_EVENT'], methods=['GET'])
 @basic_auth.required
 def get_event(event_key=None):
-    filters = []
-
-    # Retrieve filter parameters from the request
-    for key, value in request.args.items():
-        if key.startswith("Filter."):
-            # Extract the filter index
-            parts = key.split('.')
-            if len(parts) == 3:  # Ensure we have the correct format
-                index = parts[1]
-                if len(filters) < int(index):  # Ensure the filters list is long enough
-                    filters.append([None, None, None])  # Initialize with None
-                if parts[2] == "Name":
-                    filters[int(index) - 1][0] = value  # Set attribute
-                elif parts[2] == "Operator":
-                    filters[int(index) - 1][1] = value  # Set operator
-                elif parts[2] == "Value":
-                    filters[int(index) - 1][2] = value  # Set value
+    filters = request_filters()
 
     try:
         if event_key:
@@ -237,6 +273,45 @@ def get_event(event_key=None):
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+def wait_for_changes(since, filters, wait):
+    """Changed events after revision since and the current revision, waiting up to wait seconds for a change."""
+    deadline = time.time() + min(wait, LONG_POLL_MAX_SEC)
+    while True:
+        revision = events.revision()
+        if revision > since:
+            changed_events, revision = events.changes(since, filters=filters)
+            if changed_events:
+                return changed_events, revision
+            since = revision # only changes not matching the filters
+        remaining = deadline - time.time()
+        if remaining <= 0:
+            return [], revision
+        with EVENT_CHANGED:
+            # woken by changes of this worker, changes by other workers are seen by the next check
+            EVENT_CHANGED.wait(min(remaining, LONG_POLL_CHECK_SEC))
+
+def notify_event_changed():
+    with EVENT_CHANGED:
+        EVENT_CHANGED.notify_all()
+
+# changes since revision: curl -u myuser:mypassword "http://localhost:8080/event/changes?since=42&wait=55&Filter.1.Name=type&Filter.1.Operator==&Filter.1.Value=1"
+# returns the changed events (deleted with status 99) and the revision to pass as since next time,
+# with wait the request is held up to wait seconds until a matching event changes (long-poll)
+@app.route(f"{config['ROUTE_EVENT']}/{config['ROUTE_EVENT_CHANGES']}", methods=['GET'])
+@basic_auth.required
+def get_event_changes():
+    try:
+        since = int(request.args.get('since', 0))
+        wait = float(request.args.get('wait', 0))
+    except ValueError:
+        return jsonify({"error": "invalid parameter since or wait"}), 400
+
+    try:
+        changed_events, revision = wait_for_changes(since, request_filters(), wait)
+        return jsonify({"revision": revision, "events": changed_events}), 200
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
 # curl -u myuser:mypassword "http://localhost:8080/event/next?astimezone=Australia/Sydney&leadinsecs=60&leadoutsecs=60"
 @app.route(f"{config['ROUTE_EVENT']}/{config['ROUTE_EVENT_NEXT']}", methods=['GET'])
 @basic_auth.required